@@ -18,7 +18,7 @@ setup(
     url="https://github.com/yourusername/mobile-qa-multiagent",
     package_dir={"": "src"},
     packages=find_packages(where="src"),
-    python_requires=">=3.9",
+    python_requires=">=3.10",
     install_requires=[
         "google-genai>=0.1.0",
         "pyyaml>=6.0",
@@ -34,7 +34,6 @@ setup(
         "Intended Audience :: Developers",
         "Topic :: Software Development :: Testing",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
         "Programming Language :: Python :: 3.12",
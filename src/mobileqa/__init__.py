@@ -3,5 +3,15 @@ Mobile QA Multiagent System.
 
 A Supervisor-Planner-Executor system for automated mobile app testing.
 """
+import logging
+import sys
 
 __version__ = "0.1.0"
+
+# Agents log subgoal progress and warnings to the "mobileqa" logger. Print
+# them to stdout by default so library callers see them like the rest of the
+# output; remove this handler to route them elsewhere.
+_log_handler = logging.StreamHandler(sys.stdout)
+_log_handler.setFormatter(logging.Formatter("%(message)s"))
+logging.getLogger(__name__).addHandler(_log_handler)
+logging.getLogger(__name__).setLevel(logging.INFO)
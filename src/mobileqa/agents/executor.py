@@ -1,15 +1,32 @@
 """
 Executor Agent: Executes planned actions on the mobile device.
 """
+import logging
 import time
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 
 from ..tools.adb import ADB
-from ..tools.uixml import UIXMLParser
+from ..tools.uixml import UIXMLParser, UINode
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+# Map key names to Android keycodes
+_KEY_CODES = {
+    "BACK": 4,
+    "HOME": 3,
+    "ENTER": 66,
+    "DEL": 67,
+    "DELETE": 67,
+    "TAB": 61,
+    "SPACE": 62,
+}
+
+# Swipe directions, in the order used by ExecutorAgent._get_swipe_table
+_SWIPE_DIRECTIONS = ("up", "down", "left", "right")
+
+
+@dataclass(slots=True)
 class ExecutionResult:
     """Result of action execution."""
     success: bool
@@ -17,6 +34,14 @@ class ExecutionResult:
     error: str = ""
     # NEW: Reward tracking (populated by Supervisor)
     step_reward: Any = None  # Optional[StepReward], using Any to avoid circular import
+    # False when repeating the same action cannot succeed (bad params, element absent)
+    retryable: bool = True
+
+
+# Constant results for actions that never touch the device.
+# These instances are shared: callers must not mutate them.
+_WAIT_RESULT = ExecutionResult(success=True, message="Wait action skipped (fast mode, no delay)")
+_DONE_RESULT = ExecutionResult(success=True, message="Test marked as done")
 
 
 class ExecutorAgent:
@@ -25,6 +50,21 @@ class ExecutorAgent:
     Handles retries, waits, and error recovery.
     """
 
+    # Action types executed once, without the retry loop
+    _NO_RETRY = frozenset({"assert", "done", "wait", "fail"})
+
+    # Delay (seconds) before the first retry of a transient failure, doubled per attempt
+    RETRY_BACKOFF = 0.05
+
+    # Max age (seconds) of a UI dump reused between a title and body input_text.
+    # A set_ui_snapshot() snapshot is used for its action regardless of age:
+    # it is the screen that action was planned from
+    UI_CACHE_TTL = 0.5
+
+    # Key codes sent per `input keyevent` call when clearing a field; each
+    # call starts its own app_process, so backspaces are grouped
+    KEYEVENTS_PER_CALL = 50
+
     def __init__(self, adb: ADB, ui_parser: UIXMLParser, max_retries: int = 3):
         """
         Initialize Executor agent.
@@ -38,6 +78,29 @@ class ExecutorAgent:
         self.ui_parser = ui_parser
         self.max_retries = max_retries
 
+        # Map action types to handler methods (bound once per agent)
+        self._handlers = {
+            "tap_by_text": self._handle_tap_by_text,
+            "tap_xy": self._handle_tap_xy,
+            "input_text": self._handle_input_text,
+            "swipe": self._handle_swipe,
+            "keyevent": self._handle_keyevent,
+            "wait": self._handle_wait,
+            "assert": self._handle_assert,
+            "fail": self._handle_fail,
+            "done": self._handle_done,
+        }
+
+        # UI nodes from set_ui_snapshot() or the last input_text dump (see _get_ui_nodes)
+        self._ui_cache: Optional[List[UINode]] = None
+        self._ui_cache_ts = 0.0
+        self._ui_snapshot_set = False
+        # True while the action given a snapshot runs
+        self._ui_snapshot_active = False
+
+        # Built on first swipe from the parser's cached screen size
+        self._swipe_table: Optional[Dict[str, Tuple[int, int, int, int]]] = None
+
     def execute_action(self, action: Dict[str, Any]) -> ExecutionResult:
         """
         Execute an action with retries.
@@ -59,88 +122,168 @@ class ExecutorAgent:
             elif "x" in params and "y" in params:
                 action_type = "tap_xy"
             else:
-                return ExecutionResult(
-                    success=False,
-                    message="Deprecated 'tap' action without valid params. Use 'tap_by_text' or 'tap_xy'.",
-                    error="tap action requires either 'text' or 'x'/'y' params"
+                return self._fail(
+                    "Deprecated 'tap' action without valid params. Use 'tap_by_text' or 'tap_xy'.",
+                    "tap action requires either 'text' or 'x'/'y' params"
                 )
 
-        # Map action types to handler methods
-        handlers = {
-            "tap_by_text": self._handle_tap_by_text,
-            "tap_xy": self._handle_tap_xy,
-            "input_text": self._handle_input_text,
-            "swipe": self._handle_swipe,
-            "keyevent": self._handle_keyevent,
-            "wait": self._handle_wait,
-            "assert": self._handle_assert,
-            "fail": self._handle_fail,
-            "done": self._handle_done,
-        }
+        # Without a fresh snapshot from set_ui_snapshot(), only an input_text
+        # may reuse the nodes cached by a preceding title input_text
+        snapshot_set, self._ui_snapshot_set = self._ui_snapshot_set, False
+        self._ui_snapshot_active = snapshot_set
+        if action_type != "input_text" and not snapshot_set:
+            self.invalidate_ui_cache()
 
-        handler = handlers.get(action_type)
+        handler = self._handlers.get(action_type)
         if not handler:
-            return ExecutionResult(
-                success=False,
-                message=f"Unknown action type: {action_type}",
-                error=f"No handler for action type '{action_type}'"
+            return self._fail(
+                f"Unknown action type: {action_type}",
+                f"No handler for action type '{action_type}'"
             )
 
+        try:
+            return self._run_handler(action_type, handler, params, description)
+        finally:
+            # The action may have changed the screen (input_text manages its own cache)
+            if action_type != "input_text":
+                self.invalidate_ui_cache()
+
+    def _run_handler(self, action_type: str, handler, params: Dict[str, Any], description: str) -> ExecutionResult:
+        """Run an action handler, retrying interactive actions."""
         # Execute with retries (except for assert, fail, and done)
-        if action_type in ["assert", "done", "wait", "fail"]:
+        if action_type in self._NO_RETRY:
             return handler(params, description)
 
         # Retry logic for interactive actions
         for attempt in range(self.max_retries):
+            if attempt:
+                time.sleep(self.RETRY_BACKOFF * 2 ** (attempt - 1))
             result = handler(params, description)
             if result.success:
                 return result
+            if not result.retryable:
+                # Deterministic failure: another attempt would fail the same way
+                return result
+
+        return self._fail(f"Failed after {self.max_retries} attempts: {description}", result.error)
+
+    @staticmethod
+    def _ok(message: str) -> ExecutionResult:
+        """Build a successful ExecutionResult."""
+        return ExecutionResult(success=True, message=message)
 
-        return ExecutionResult(
-            success=False,
-            message=f"Failed after {self.max_retries} attempts: {description}",
-            error=result.error
-        )
+    @staticmethod
+    def _fail(message: str, error: str = "", retryable: bool = True) -> ExecutionResult:
+        """Build a failed ExecutionResult."""
+        return ExecutionResult(success=False, message=message, error=error, retryable=retryable)
+
+    def set_ui_snapshot(self, nodes: List[UINode]):
+        """
+        Provide the parsed UI the next action was planned from.
+
+        tap_by_text and input_text resolve their targets against these nodes
+        instead of dumping the UI again. The snapshot is dropped once the
+        next execute_action call finishes.
+
+        Args:
+            nodes: Parsed UI nodes of the current screen
+        """
+        self._ui_cache = nodes
+        self._ui_cache_ts = time.monotonic()
+        self._ui_snapshot_set = True
+
+    def invalidate_ui_cache(self):
+        """Drop the cached UI nodes so the next lookup dumps the UI again."""
+        self._ui_cache = None
+        self._ui_cache_ts = 0.0
+
+    def _ui_cache_fresh(self, max_age: Optional[float] = None) -> bool:
+        """Check whether cached UI nodes are this action's snapshot or younger than max_age seconds."""
+        if self._ui_cache is None:
+            return False
+        if self._ui_snapshot_active:
+            return True
+        if max_age is None:
+            max_age = self.UI_CACHE_TTL
+        return time.monotonic() - self._ui_cache_ts < max_age
+
+    def _get_ui_nodes(self, max_age: Optional[float] = None) -> List[UINode]:
+        """
+        Get parsed UI nodes, reusing the cached dump if it is recent enough.
+
+        Args:
+            max_age: Maximum cache age in seconds (defaults to UI_CACHE_TTL)
+
+        Returns:
+            List of UINode objects for the current screen
+        """
+        if self._ui_cache_fresh(max_age):
+            return self._ui_cache
+
+        xml_path = self.ui_parser.dump_ui()
+        self._ui_cache = self.ui_parser.parse_xml(xml_path)
+        self._ui_cache_ts = time.monotonic()
+        return self._ui_cache
 
     def _handle_tap_by_text(self, params: Dict[str, Any], description: str) -> ExecutionResult:
         """Handle tap_by_text action by finding element by text and tapping it."""
         text = params.get("text")
         if not text:
-            return ExecutionResult(
-                success=False,
-                message="tap_by_text action missing 'text' parameter",
-                error="No text specified for tap_by_text"
+            return self._fail(
+                "tap_by_text action missing 'text' parameter",
+                "No text specified for tap_by_text",
+                retryable=False
             )
 
         try:
-            # Try exact match first
-            success = self.ui_parser.tap_by_text(text, exact=True)
-            if success:
-                return ExecutionResult(
-                    success=True,
-                    message=f"Tapped element with text: {text}"
-                )
-
-            # Try substring match
-            success = self.ui_parser.tap_by_text(text, exact=False)
-            if success:
-                return ExecutionResult(
-                    success=True,
-                    message=f"Tapped element containing text: {text}"
-                )
-
-            return ExecutionResult(
-                success=False,
-                message=f"Element not found: {text}",
-                error=f"No UI element found with text '{text}'"
+            index = params.get("index")
+            target = None
+            if self._ui_cache_fresh():
+                # Resolve against the UI the action was planned from
+                target = self._find_tap_target(self._ui_cache, text, index)
+                if target is None:
+                    # The cached UI may be stale: look again on a fresh dump
+                    self.invalidate_ui_cache()
+            if target is None:
+                target = self._find_tap_target(self._get_ui_nodes(), text)
+
+            if target is not None:
+                x, y = target.center
+                self.adb.tap_xy(x, y)
+                if target.text == text or target.content_desc == text:
+                    return self._ok(f"Tapped element with text: {text}")
+                return self._ok(f"Tapped element containing text: {text}")
+
+            return self._fail(
+                f"Element not found: {text}",
+                f"No UI element found with text '{text}'",
+                retryable=False
             )
 
         except Exception as e:
-            return ExecutionResult(
-                success=False,
-                message=f"Tap failed: {str(e)}",
-                error=str(e)
-            )
+            return self._fail(f"Tap failed: {str(e)}", str(e))
+
+    def _find_tap_target(self, nodes: List[UINode], text: str, index: Any = None) -> Optional[UINode]:
+        """
+        Find the node to tap for tap_by_text.
+
+        Args:
+            nodes: Parsed UI nodes
+            text: Text of the element to tap
+            index: Optional node index from the compact UI summary; used only
+                   if that node's text or content-desc contains `text`
+
+        Returns:
+            Node to tap, or None if no node matches
+        """
+        if isinstance(index, int) and not isinstance(index, bool) and 0 <= index < len(nodes):
+            node = nodes[index]
+            text_lower = text.lower()
+            if text_lower in node.text_lower or text_lower in node.content_desc_lower:
+                return node
+
+        # Exact matches first, then case-insensitive, then substring
+        return self.ui_parser.find_tap_target(nodes, text, exact=False)
 
     def _handle_tap_xy(self, params: Dict[str, Any], description: str) -> ExecutionResult:
         """Handle tap at specific coordinates."""
@@ -148,24 +291,17 @@ class ExecutorAgent:
         y = params.get("y")
 
         if x is None or y is None:
-            return ExecutionResult(
-                success=False,
-                message="tap_xy action missing 'x' or 'y' parameter",
-                error="Coordinates not specified"
+            return self._fail(
+                "tap_xy action missing 'x' or 'y' parameter",
+                "Coordinates not specified",
+                retryable=False
             )
 
         try:
             self.adb.tap_xy(int(x), int(y))
-            return ExecutionResult(
-                success=True,
-                message=f"Tapped at ({x}, {y})"
-            )
+            return self._ok(f"Tapped at ({x}, {y})")
         except Exception as e:
-            return ExecutionResult(
-                success=False,
-                message=f"Tap failed at ({x}, {y}): {str(e)}",
-                error=str(e)
-            )
+            return self._fail(f"Tap failed at ({x}, {y}): {str(e)}", str(e))
 
     def _handle_input_text(self, params: Dict[str, Any], description: str) -> ExecutionResult:
         """
@@ -173,209 +309,191 @@ class ExecutorAgent:
         """
         text = params.get("text")
         if not text:
-            return ExecutionResult(
-                success=False,
-                message="input_text action missing 'text' parameter",
-                error="No text specified for input"
+            return self._fail(
+                "input_text action missing 'text' parameter",
+                "No text specified for input",
+                retryable=False
             )
 
         try:
-            # Dump UI to find EditText fields
-            xml_path = self.ui_parser.dump_ui()
-            nodes = self.ui_parser.parse_xml(xml_path)
-
-            # Find EditText nodes
-            edit_texts = [
-                node for node in nodes
-                if 'EditText' in node.class_name and node.enabled
-            ]
-
-            if not edit_texts:
-                return ExecutionResult(
-                    success=False,
-                    message="No EditText field found on screen",
-                    error="Cannot type text without an input field"
+            # Dump UI to find EditText fields (reused right after a title input)
+            nodes = self._get_ui_nodes()
+
+            # Single pass over the nodes: collect everything the field_type
+            # branches below need (topmost two, largest, untitled, focused)
+            count = 0
+            top1 = top2 = largest = first_untitled = first_focused = None
+            largest_area = -1
+            untitled_centers = set()
+            for node in nodes:
+                if 'EditText' not in node.class_name or not node.enabled:
+                    continue
+                count += 1
+
+                # Two smallest Y coordinates (stable: earlier node wins ties)
+                y = node.bounds[1]
+                if top1 is None or y < top1.bounds[1]:
+                    top1, top2 = node, top1
+                elif top2 is None or y < top2.bounds[1]:
+                    top2 = node
+
+                area = (node.bounds[2] - node.bounds[0]) * (node.bounds[3] - node.bounds[1])
+                if area > largest_area:
+                    largest, largest_area = node, area
+
+                if "untitled" in (node.text or "").lower():
+                    if first_untitled is None:
+                        first_untitled = node
+                    untitled_centers.add(node.center)
+
+                if first_focused is None and node.focused:
+                    first_focused = node
+
+            if not count:
+                self.invalidate_ui_cache()
+                return self._fail(
+                    "No EditText field found on screen",
+                    "Cannot type text without an input field"
                 )
 
             # Choose the best EditText based on field_type or defaults
             field_type = params.get("field_type", "").lower()
-            
-            # Sort by Y coordinate (top to bottom)
-            sorted_by_y = sorted(edit_texts, key=lambda n: n.bounds[1])
-            
+
             if field_type == "title":
                 # Title often contains "Untitled" for new notes
-                untitled = [et for et in edit_texts if "untitled" in (et.text or "").lower()]
-                if untitled:
-                    target = untitled[0]
-                    print(f"  Selecting Title field (matches 'Untitled') at {target.center}")
+                if first_untitled is not None:
+                    target = first_untitled
+                    logger.debug("Selecting Title field (matches 'Untitled') at %s", target.center)
                 else:
                     # Fallback: Title is usually the topmost field
-                    target = sorted_by_y[0]
-                    print(f"  Selecting Title field (topmost) at {target.center}")
-            
+                    target = top1
+                    logger.debug("Selecting Title field (topmost) at %s", target.center)
+
             elif field_type == "body":
                 # Body is usually the largest field or the second one
-                if len(edit_texts) > 1:
+                if count > 1:
                     # Try to find the largest field by area
-                    target = max(edit_texts, key=lambda n: (n.bounds[2] - n.bounds[0]) * (n.bounds[3] - n.bounds[1]))
+                    target = largest
                     # If largest is seemingly the same as title (e.g. title is short/small), ensure we don't pick title
                     # If title was "Untitled", avoid it
-                    untitled_centers = [et.center for et in edit_texts if "untitled" in (et.text or "").lower()]
-                    if target.center in untitled_centers and len(edit_texts) >= 2:
+                    if target.center in untitled_centers:
                         # Pick the other large one
-                        target = sorted_by_y[1]
-                    
+                        target = top2
+
                     # If target is simply the topmost one, check if there's a second one
-                    elif target == sorted_by_y[0] and len(edit_texts) >= 2:
-                        target = sorted_by_y[1]
-                        
-                    print(f"  Selecting Body field at {target.center}")
+                    elif target == top1:
+                        target = top2
+
+                    logger.debug("Selecting Body field at %s", target.center)
                 else:
-                    target = edit_texts[0]
-            
+                    target = top1
+
             else:
                 # Default behavior: focused > topmost
-                focused = [et for et in edit_texts if et.focused]
-                if focused:
-                    target = focused[0]
-                elif len(edit_texts) > 1:
-                    # Multiple fields: prefer topmost (usually title field)
-                    target = sorted_by_y[0]
+                # (with a single field, top1 is that field)
+                if first_focused is not None:
+                    target = first_focused
                 else:
-                    # Single field: use it
-                    target = edit_texts[0]
+                    target = top1
 
-            # Tap to focus the EditText
+            # Build the whole focus/clear/type sequence and send it as one
+            # shell command to avoid an ADB round-trip per key press.
             x, y = target.center
-            self.adb.tap_xy(x, y, wait_after=0.0)
+            commands = [f"input tap {x} {y}"]
 
             # Clear existing text using select all + delete (more reliable)
-            # Try Ctrl+A (Android 13+)
-            try:
-                self.adb._run_command(['shell', 'input', 'keycombination', '113', '29'])  # Ctrl+A
-                self.adb.keyevent(67, wait_after=0.0)
-            except:
-                # Fallback: move to end and backspace multiple times
-                self.adb.keyevent(123, wait_after=0.0)
-                for _ in range(50):
-                    self.adb.keyevent(67, wait_after=0.0)
+            # Try Ctrl+A (Android 13+), fallback: move to end and backspace
+            # just past the field's current text length
+            select_all = "input keycombination 113 29 && input keyevent 67"
+            clear_count = len(target.text or "") + 2
+            backspaces = "; ".join(
+                "input keyevent" + " 67" * min(self.KEYEVENTS_PER_CALL, clear_count - start)
+                for start in range(0, clear_count, self.KEYEVENTS_PER_CALL)
+            )
+            commands.append(f"{{ {{ {select_all}; }} 2>/dev/null || {{ input keyevent 123; {backspaces}; }}; }}")
 
             # Type the new text
-            self.adb.type_text(text, wait_after=0.0)
+            commands.append(f"input text {self.adb.quote_text(text)}")
 
             # CRITICAL FIX: If typing into title field, press ENTER to move to body
             # This allows the next input_text with field_type="body" to work correctly
             if field_type == "title":
-                print(f"  Pressing ENTER after typing title to move to body field")
-                self.adb.keyevent(66, wait_after=0.0)
+                logger.debug("Pressing ENTER after typing title to move to body field")
+                commands.append("input keyevent 66")
 
-            return ExecutionResult(
-                success=True,
-                message=f"Typed text into {field_type if field_type else 'EditText'}: {text}"
-            )
+            self.adb.shell_pipeline(commands)
+
+            # Keep the dump for the body input that follows a title input
+            if field_type != "title":
+                self.invalidate_ui_cache()
+
+            return self._ok(f"Typed text into {field_type if field_type else 'EditText'}: {text}")
 
         except Exception as e:
-            return ExecutionResult(
-                success=False,
-                message=f"Text input failed: {str(e)}",
-                error=str(e)
-            )
+            self.invalidate_ui_cache()
+            return self._fail(f"Text input failed: {str(e)}", str(e))
 
     def _handle_swipe(self, params: Dict[str, Any], description: str) -> ExecutionResult:
         """Handle swipe gesture."""
         direction = params.get("direction", "up").lower()
 
+        # Reject bad directions before the first swipe reads the screen size
+        if direction not in _SWIPE_DIRECTIONS:
+            return self._fail(
+                f"Invalid swipe direction: {direction}",
+                f"Direction must be one of: {list(_SWIPE_DIRECTIONS)}",
+                retryable=False
+            )
+
         try:
-            # Get screen size
-            width, height = self.adb.wm_size()
+            x1, y1, x2, y2 = self._get_swipe_table()[direction]
+            self.adb.swipe(x1, y1, x2, y2)
+            return self._ok(f"Swiped {direction}")
+
+        except Exception as e:
+            return self._fail(f"Swipe failed: {str(e)}", str(e))
+
+    def _get_swipe_table(self) -> Dict[str, Tuple[int, int, int, int]]:
+        """Get swipe coordinates per direction, computed from the cached screen size."""
+        if self._swipe_table is None:
+            width, height = self.ui_parser.screen_size()
 
             # Define swipe coordinates based on direction
-            swipes = {
+            self._swipe_table = {
                 "up": (width // 2, height * 3 // 4, width // 2, height // 4),
                 "down": (width // 2, height // 4, width // 2, height * 3 // 4),
                 "left": (width * 3 // 4, height // 2, width // 4, height // 2),
                 "right": (width // 4, height // 2, width * 3 // 4, height // 2),
             }
+        return self._swipe_table
 
-            if direction not in swipes:
-                return ExecutionResult(
-                    success=False,
-                    message=f"Invalid swipe direction: {direction}",
-                    error=f"Direction must be one of: {list(swipes.keys())}"
-                )
-
-            x1, y1, x2, y2 = swipes[direction]
-            self.adb.swipe(x1, y1, x2, y2)
-            return ExecutionResult(
-                success=True,
-                message=f"Swiped {direction}"
-            )
-
-        except Exception as e:
-            return ExecutionResult(
-                success=False,
-                message=f"Swipe failed: {str(e)}",
-                error=str(e)
-            )
+    def invalidate_screen_size(self):
+        """Forget the cached screen size (e.g. after a device rotation)."""
+        self.ui_parser.invalidate_screen_size()
+        self._swipe_table = None
 
     def _handle_keyevent(self, params: Dict[str, Any], description: str) -> ExecutionResult:
         """Handle key event."""
-        key = params.get("key", "").upper()
-
-        # Map key names to Android keycodes
-        key_codes = {
-            "BACK": 4,
-            "HOME": 3,
-            "ENTER": 66,
-            "DEL": 67,
-            "DELETE": 67,
-            "TAB": 61,
-            "SPACE": 62,
-        }
+        key = str(params.get("key", "")).upper()
 
         try:
-            keycode = key_codes.get(key)
+            keycode = _KEY_CODES.get(key)
             if keycode is None:
                 # Try to use as numeric keycode
-                try:
-                    keycode = int(key)
-                except ValueError:
-                    return ExecutionResult(
-                        success=False,
-                        message=f"Unknown key: {key}",
-                        error=f"Key '{key}' not recognized"
-                    )
+                if not key.isdigit():
+                    return self._fail(f"Unknown key: {key}", f"Key '{key}' not recognized", retryable=False)
+                keycode = int(key)
 
             self.adb.keyevent(keycode)
-            return ExecutionResult(
-                success=True,
-                message=f"Pressed key: {key}"
-            )
+            return self._ok(f"Pressed key: {key}")
 
         except Exception as e:
-            return ExecutionResult(
-                success=False,
-                message=f"Keyevent failed: {str(e)}",
-                error=str(e)
-            )
+            return self._fail(f"Keyevent failed: {str(e)}", str(e))
 
     def _handle_wait(self, params: Dict[str, Any], description: str) -> ExecutionResult:
         """Handle wait action (NO-OP in fast mode)."""
-        seconds = params.get("seconds", 0.0)
-
-        try:
-            # NO SLEEP - instant return for maximum speed
-            return ExecutionResult(
-                success=True,
-                message=f"Wait action skipped (fast mode, no delay)"
-            )
-        except Exception as e:
-            return ExecutionResult(
-                success=False,
-                message=f"Wait failed: {str(e)}",
-                error=str(e)
-            )
+        # NO SLEEP - instant return for maximum speed
+        return _WAIT_RESULT
 
     def _handle_assert(self, params: Dict[str, Any], description: str) -> ExecutionResult:
         """
@@ -384,23 +502,13 @@ class ExecutorAgent:
         """
         condition = params.get("condition", description)
 
-        return ExecutionResult(
-            success=True,
-            message=f"Assertion recorded: {condition}"
-        )
+        return self._ok(f"Assertion recorded: {condition}")
 
     def _handle_fail(self, params: Dict[str, Any], description: str) -> ExecutionResult:
         """Handle fail action - explicit failure signal."""
         reason = params.get("reason", description)
-        return ExecutionResult(
-            success=False,
-            message=f"Action failed explicitly: {reason}",
-            error=reason
-        )
+        return self._fail(f"Action failed explicitly: {reason}", reason)
 
     def _handle_done(self, params: Dict[str, Any], description: str) -> ExecutionResult:
         """Handle done action - test completion signal."""
-        return ExecutionResult(
-            success=True,
-            message="Test marked as done"
-        )
+        return _DONE_RESULT
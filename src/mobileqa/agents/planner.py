@@ -1,69 +1,16 @@
 """
 Planner Agent: Determines next action based on current state and test goal.
 """
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 
 from ..llm.gemini_client import GeminiClient
+from ..tools.uixml import truncate_summary
 
 
-class PlannerAgent:
-    """
-    Planner agent that analyzes current UI state and determines next action.
-    Returns structured JSON action for the Executor.
-    """
-
-    def __init__(self, llm_client: GeminiClient):
-        """
-        Initialize Planner agent.
-
-        Args:
-            llm_client: Gemini client for LLM inference
-        """
-        self.llm = llm_client
-
-    def plan_next_action(
-        self,
-        test_goal: str,
-        current_step: int,
-        screenshot_path: str,
-        ui_xml_summary: str,
-        previous_actions: list = None
-    ) -> Dict[str, Any]:
-        """
-        Plan the next action to achieve the test goal.
-
-        Args:
-            test_goal: Natural language description of test objective
-            current_step: Current step number
-            screenshot_path: Path to current screenshot
-            ui_xml_summary: Summary of UI hierarchy
-            previous_actions: List of previous actions taken
-
-        Returns:
-            Action dictionary with:
-            {
-                "action_type": "tap" | "swipe" | "input_text" | "assert" | "wait" | "done",
-                "description": "Human-readable description",
-                "params": {...}  # Action-specific parameters
-            }
-        """
-        if previous_actions is None:
-            previous_actions = []
-
-        # Build context of previous actions with success/failure info
-        if previous_actions:
-            prev_actions_list = []
-            for i, action in enumerate(previous_actions):
-                desc = action.get('description', action.get('action_type'))
-                action_type = action.get('action_type', 'unknown')
-                # Include the action for context
-                prev_actions_list.append(f"{i+1}. {action_type}: {desc}")
-            prev_actions_str = "\n".join(prev_actions_list)
-        else:
-            prev_actions_str = "None - this is the first step"
-
-        prompt = f"""You are a QA automation planner for mobile apps. Your task is to output EXACTLY ONE valid action in strict JSON format.
+# Prompt for plan_next_action, filled with str.format() on every step
+PLANNER_PROMPT_TEMPLATE = """You are a QA automation planner for mobile apps. Your task is to output EXACTLY ONE valid action in strict JSON format.
 
 TEST GOAL:
 {test_goal}
@@ -73,27 +20,30 @@ CURRENT STEP: {current_step}
 PREVIOUS ACTIONS TAKEN:
 {prev_actions_str}
 
-CURRENT UI STATE (from XML hierarchy):
-{ui_xml_summary}
+CURRENT UI STATE (from XML hierarchy; one element per line: [index] Class "text" desc="..." @center_x,center_y [flags]):
+{ui_xml_summary}"""
 
-Based on the screenshot and UI state, determine the NEXT action to take.
+# Static action schema and rules appended after the prompt (not formatted,
+# so braces are literal)
+PLANNER_RULES = """Based on the screenshot and UI state, determine the NEXT action to take.
 
 STRICT ACTION SCHEMA - You MUST output valid JSON matching ONE of these:
 
 1. tap_by_text - Tap on a visible text element
-   {{"action_type": "tap_by_text", "description": "...", "params": {{"text": "exact visible text"}}}}
+   {"action_type": "tap_by_text", "description": "...", "params": {"text": "exact visible text", "index": 12}}
    REQUIREMENTS:
    - params.text MUST be a non-empty string that appears in the UI STATE above
+   - params.index SHOULD be the [index] of that element in the UI STATE above
    - DO NOT use tap_by_text if the text is not visible
 
 2. tap_xy - Tap at specific pixel coordinates
-   {{"action_type": "tap_xy", "description": "...", "params": {{"x": 540, "y": 1000}}}}
+   {"action_type": "tap_xy", "description": "...", "params": {"x": 540, "y": 1000}}
    REQUIREMENTS:
-   - params.x and params.y MUST be integers
+   - params.x and params.y MUST be integers (use the @x,y center from the UI STATE above)
    - Use only when tap_by_text is not possible
 
 3. input_text - Type text (automatically finds and focuses the best EditText field)
-   {{"action_type": "input_text", "description": "...", "params": {{"text": "text to type", "field_type": "title"}}}}
+   {"action_type": "input_text", "description": "...", "params": {"text": "text to type", "field_type": "title"}}
    REQUIREMENTS:
    - Use this to type into input fields (vault name, note title, note content, etc.)
    - Executor will find the EditText, focus it, clear existing text, and type
@@ -106,41 +56,41 @@ STRICT ACTION SCHEMA - You MUST output valid JSON matching ONE of these:
    - For single-field inputs (like vault names), field_type can be omitted.
 
 4. swipe - Swipe gesture
-   {{"action_type": "swipe", "description": "...", "params": {{"direction": "up"}}}}
+   {"action_type": "swipe", "description": "...", "params": {"direction": "up"}}
    REQUIREMENTS:
    - params.direction must be one of: "up", "down", "left", "right"
 
 5. keyevent - Press a key
-   {{"action_type": "keyevent", "description": "...", "params": {{"key": "BACK"}}}}
+   {"action_type": "keyevent", "description": "...", "params": {"key": "BACK"}}
    REQUIREMENTS:
    - params.key must be one of: "BACK", "HOME", "ENTER", "DEL"
 
 6. wait - Wait for UI to settle
-   {{"action_type": "wait", "description": "...", "params": {{"seconds": 1.0}}}}
+   {"action_type": "wait", "description": "...", "params": {"seconds": 1.0}}
 
 7. assert - Make an assertion about current state
-   {{"action_type": "assert", "description": "...", "params": {{"condition": "text 'X' is visible"}}}}
+   {"action_type": "assert", "description": "...", "params": {"condition": "text 'X' is visible"}}
    REQUIREMENTS:
    - Use this when the test goal requires VERIFYING a condition (e.g., icon is red, button exists)
    - Assertion failures result in FAIL_ASSERTION verdict
    - Examples: "Appearance icon is red", "Settings page visible", "Text 'Welcome' exists"
 
 8. fail - Explicitly fail the test (e.g. feature not found)
-   {{"action_type": "fail", "description": "Feature X not found", "params": {{"reason": "Menu option missing"}}}}
+   {"action_type": "fail", "description": "Feature X not found", "params": {"reason": "Menu option missing"}}
    REQUIREMENTS:
    - Use this when a required element is definitely missing after searching.
    - This signals FAIL_ACTION verdict.
 
 9. done - Test complete
-   {{"action_type": "done", "description": "Test goal achieved", "params": {{}}}}
+   {"action_type": "done", "description": "Test goal achieved", "params": {}}
 
 CRITICAL RULES:
 - NEVER output action_type "tap" - it is INVALID. Use "tap_by_text" or "tap_xy" or "input_text"
 - For tap_by_text: params.text MUST be non-empty and visible in UI STATE
 - For tap_xy: params.x and params.y MUST be present and numeric
 - For input_text creating notes with title and body:
-  * FIRST action: {{"action_type": "input_text", "params": {{"text": "Title Text", "field_type": "title"}}}}
-  * SECOND action: {{"action_type": "input_text", "params": {{"text": "Body Text", "field_type": "body"}}}}
+  * FIRST action: {"action_type": "input_text", "params": {"text": "Title Text", "field_type": "title"}}
+  * SECOND action: {"action_type": "input_text", "params": {"text": "Body Text", "field_type": "body"}}
   * Do NOT use keyevent or tap between title and body - the system auto-handles navigation
 - If you want to focus/click an input field to type, use "input_text" directly (do NOT tap first)
 - When multiple input fields exist, specify "field_type" to disambiguate.
@@ -172,9 +122,157 @@ CRITICAL RULES:
 
 Respond with valid JSON only:"""
 
+
+def _freeze(value: Any) -> Any:
+    """Convert a JSON-like value into a hashable, type-tagged form for caching."""
+    if isinstance(value, dict):
+        return (dict, tuple((k, _freeze(v)) for k, v in sorted(value.items())))
+    if isinstance(value, list):
+        return (list, tuple(_freeze(v) for v in value))
+    # Tag scalars with their type so 1, 1.0 and True stay distinct keys
+    return (type(value), value)
+
+
+def _thaw(frozen: Any) -> Any:
+    """Rebuild the value frozen by _freeze()."""
+    kind, value = frozen
+    if kind is dict:
+        return {k: _thaw(v) for k, v in value}
+    if kind is list:
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _validate_tap_by_text(params: Dict[str, Any]) -> Tuple[bool, str]:
+    """Validate tap_by_text params."""
+    if "text" not in params:
+        return False, "tap_by_text requires params.text"
+    if not params["text"] or not isinstance(params["text"], str):
+        return False, "tap_by_text params.text must be a non-empty string"
+    return True, ""
+
+
+def _validate_tap_xy(params: Dict[str, Any]) -> Tuple[bool, str]:
+    """Validate tap_xy params."""
+    if "x" not in params or "y" not in params:
+        return False, "tap_xy requires params.x and params.y"
+    if not isinstance(params["x"], (int, float)) or not isinstance(params["y"], (int, float)):
+        return False, "tap_xy params.x and params.y must be numeric"
+    return True, ""
+
+
+def _validate_input_text(params: Dict[str, Any]) -> Tuple[bool, str]:
+    """Validate input_text params."""
+    if "text" not in params:
+        return False, "input_text requires params.text"
+    if not isinstance(params["text"], str):
+        return False, "input_text params.text must be a string"
+    return True, ""
+
+
+def _validate_swipe(params: Dict[str, Any]) -> Tuple[bool, str]:
+    """Validate swipe params."""
+    if "direction" not in params:
+        return False, "swipe requires params.direction"
+    if params["direction"] not in ("up", "down", "left", "right"):
+        return False, "swipe params.direction must be one of: up, down, left, right"
+    return True, ""
+
+
+def _validate_keyevent(params: Dict[str, Any]) -> Tuple[bool, str]:
+    """Validate keyevent params."""
+    if "key" not in params:
+        return False, "keyevent requires params.key"
+    return True, ""
+
+
+class PlannerAgent:
+    """
+    Planner agent that analyzes current UI state and determines next action.
+    Returns structured JSON action for the Executor.
+    """
+
+    # Prompt size limits: trade full history/UI detail for lower LLM latency
+    MAX_PREVIOUS_ACTIONS = 10
+    MAX_UI_SUMMARY_CHARS = 3000
+
+    # Action schema (NOTE: "tap" is NOT a valid action type)
+    _REQUIRED_FIELDS = ("action_type", "description", "params")
+    _ACTION_TYPES = (
+        "tap_by_text", "tap_xy", "input_text", "swipe",
+        "keyevent", "wait", "assert", "fail", "done"
+    )
+    _VALID_ACTION_TYPES = frozenset(_ACTION_TYPES)
+    _VALID_ACTION_TYPES_STR = ", ".join(_ACTION_TYPES)
+
+    # Per-action params validators; action types not listed take any params
+    _PARAM_VALIDATORS = {
+        "tap_by_text": _validate_tap_by_text,
+        "tap_xy": _validate_tap_xy,
+        "input_text": _validate_input_text,
+        "swipe": _validate_swipe,
+        "keyevent": _validate_keyevent,
+    }
+
+    def __init__(self, llm_client: GeminiClient):
+        """
+        Initialize Planner agent.
+
+        Args:
+            llm_client: Gemini client for LLM inference
+        """
+        self.llm = llm_client
+
+    def plan_next_action(
+        self,
+        test_goal: str,
+        current_step: int,
+        screenshot_path: str,
+        ui_xml_summary: str,
+        previous_actions: list = None
+    ) -> Dict[str, Any]:
+        """
+        Plan the next action to achieve the test goal.
+
+        Args:
+            test_goal: Natural language description of test objective
+            current_step: Current step number
+            screenshot_path: Path to current screenshot
+            ui_xml_summary: Summary of UI hierarchy
+            previous_actions: List of previous actions taken
+
+        Returns:
+            Action dictionary with:
+            {
+                "action_type": "tap" | "swipe" | "input_text" | "assert" | "wait" | "done",
+                "description": "Human-readable description",
+                "params": {...}  # Action-specific parameters
+            }
+        """
+        if previous_actions is None:
+            previous_actions = []
+
+        # Build context of previous actions with success/failure info,
+        # keeping only the most recent ones
+        omitted = max(len(previous_actions) - self.MAX_PREVIOUS_ACTIONS, 0)
+        prev_actions_str = "\n".join(
+            f"{i}. {action.get('action_type', 'unknown')}: "
+            f"{action.get('description') or action.get('action_type', 'unknown')}"
+            for i, action in enumerate(previous_actions[omitted:], omitted + 1)
+        ) or "None - this is the first step"
+        if omitted:
+            prev_actions_str = f"(... {omitted} earlier actions omitted)\n{prev_actions_str}"
+
+        prompt = PLANNER_PROMPT_TEMPLATE.format(
+            test_goal=test_goal,
+            current_step=current_step,
+            prev_actions_str=prev_actions_str,
+            ui_xml_summary=truncate_summary(ui_xml_summary, self.MAX_UI_SUMMARY_CHARS)
+        )
+
         try:
             action = self.llm.generate_json(
-                prompt=prompt,
+                prompt=f"{prompt}\n\n{PLANNER_RULES}",
                 image_path=screenshot_path,
                 temperature=0.3  # Lower temperature for more consistent planning
             )
@@ -208,54 +306,38 @@ Respond with valid JSON only:"""
         if not isinstance(action, dict):
             return False, "Action is not a dictionary"
 
+        # Identical actions (retries, replays) hit the cache
+        try:
+            frozen = _freeze(action)
+            hash(frozen)
+        except TypeError:
+            return self._validate(action)
+        return self._validate_frozen(frozen)
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _validate_frozen(frozen: tuple) -> Tuple[bool, str]:
+        """Cached validation of an action frozen with _freeze()."""
+        return PlannerAgent._validate(_thaw(frozen))
+
+    @classmethod
+    def _validate(cls, action: Dict[str, Any]) -> Tuple[bool, str]:
+        """Validate an action dictionary (uncached)."""
         # Check required fields
-        required_fields = ["action_type", "description", "params"]
-        for field in required_fields:
+        for field in cls._REQUIRED_FIELDS:
             if field not in action:
                 return False, f"Missing required field: {field}"
 
         action_type = action.get("action_type")
         params = action.get("params", {})
 
-        # Valid action types (NOTE: "tap" is NOT valid)
-        valid_action_types = [
-            "tap_by_text", "tap_xy", "input_text", "swipe",
-            "keyevent", "wait", "assert", "fail", "done"
-        ]
-
-        if action_type not in valid_action_types:
-            return False, f"Invalid action_type '{action_type}'. Use one of: {', '.join(valid_action_types)}"
+        # (the str check keeps unhashable JSON values out of the frozenset lookup)
+        if not isinstance(action_type, str) or action_type not in cls._VALID_ACTION_TYPES:
+            return False, f"Invalid action_type '{action_type}'. Use one of: {cls._VALID_ACTION_TYPES_STR}"
 
         # Validate params based on action type
-        if action_type == "tap_by_text":
-            if "text" not in params:
-                return False, "tap_by_text requires params.text"
-            if not params["text"] or not isinstance(params["text"], str):
-                return False, "tap_by_text params.text must be a non-empty string"
-
-        elif action_type == "tap_xy":
-            if "x" not in params or "y" not in params:
-                return False, "tap_xy requires params.x and params.y"
-            if not isinstance(params["x"], (int, float)) or not isinstance(params["y"], (int, float)):
-                return False, "tap_xy params.x and params.y must be numeric"
-
-        elif action_type == "input_text":
-            if "text" not in params:
-                return False, "input_text requires params.text"
-            if not isinstance(params["text"], str):
-                return False, "input_text params.text must be a string"
-
-        elif action_type == "swipe":
-            if "direction" not in params:
-                return False, "swipe requires params.direction"
-            if params["direction"] not in ["up", "down", "left", "right"]:
-                return False, "swipe params.direction must be one of: up, down, left, right"
-
-        elif action_type == "keyevent":
-            if "key" not in params:
-                return False, "keyevent requires params.key"
-
-        return True, ""
+        validator = cls._PARAM_VALIDATORS.get(action_type)
+        return validator(params) if validator else (True, "")
 
     def validate_action(self, action: Dict[str, Any]) -> bool:
         """
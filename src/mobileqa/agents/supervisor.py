@@ -1,19 +1,212 @@
 """
 Supervisor Agent: Monitors test execution and determines PASS/FAIL verdict.
 """
-from typing import Dict, Any, List, Optional
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Any, Callable, List, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
-from ..llm.gemini_client import GeminiClient
+from ..tools.uixml import truncate_summary
 from .executor import ExecutionResult
-from ..evaluation.subgoals import (
-    SubgoalDecomposition,
-    SubgoalStatus,
-    RewardCalculator,
-    StepReward
+
+if TYPE_CHECKING:
+    # Annotation-only: the LLM client and subgoal objects are passed in by
+    # the runner, so importing the supervisor doesn't pull in google-genai
+    from ..llm.gemini_client import GeminiClient
+    from ..evaluation.subgoals import (
+        Subgoal,
+        SubgoalDecomposition,
+        RewardCalculator,
+        StepReward
+    )
+
+logger = logging.getLogger(__name__)
+
+
+def _params(action: Dict[str, Any]) -> Dict[str, Any]:
+    params = action.get("params")
+    return params if isinstance(params, dict) else {}
+
+
+# Leading characters of typed text looked up in the UI summary (summaries
+# may cut long text fields short)
+_TYPED_TEXT_MATCH_CHARS = 40
+
+
+def _typed_into(field_type: str) -> Callable[[Dict[str, Any], ExecutionResult, str], bool]:
+    """Rule predicate: input_text into the given field succeeded and the typed text is on screen."""
+    def predicate(action, execution_result, ui_lower):
+        params = _params(action)
+        typed = str(params.get("text") or "").strip().lower()[:_TYPED_TEXT_MATCH_CHARS]
+        return (
+            execution_result.success
+            and action.get("action_type") == "input_text"
+            and params.get("field_type") == field_type
+            and bool(typed)
+            and typed in ui_lower
+        )
+    return predicate
+
+
+def _tapped_create_note(action, execution_result, ui_lower):
+    """Rule predicate: tap_by_text on 'Create new note' succeeded."""
+    return (
+        execution_result.success
+        and action.get("action_type") == "tap_by_text"
+        and "create new note" in str(_params(action).get("text", "")).lower()
+    )
+
+
+def _create_note_visible(action, execution_result, ui_lower):
+    """Rule predicate: the 'Create new note' button is on screen."""
+    return "create new note" in ui_lower
+
+
+# Deterministic subgoal checks tried before asking the LLM, taken from the
+# detection examples in SUBGOAL_DETECTION_PROMPT_TEMPLATE:
+# (lowercase description phrase, predicate(action, execution_result, ui_lower), reason)
+_SUBGOAL_RULES: Tuple[Tuple[str, Callable[[Dict[str, Any], ExecutionResult, str], bool], str], ...] = (
+    ("title field populated", _typed_into("title"), "typed title text is visible"),
+    ("body field populated", _typed_into("body"), "typed body text is visible"),
+    ("note creation initiated", _tapped_create_note, "tap on 'Create new note' succeeded"),
+    ("inside vault view", _create_note_visible, "'Create new note' is visible"),
 )
 
+# Supervisor prompts, filled with str.format() on every verification
+SUBGOAL_DETECTION_PROMPT_TEMPLATE = """You are evaluating whether any pending subgoals were achieved in this test step.
+
+ACTION EXECUTED: {action_type} - {action_desc}
+EXECUTION SUCCESS: {exec_success}
+EXECUTION MESSAGE: {exec_message}
+
+PENDING SUBGOALS:
+{pending_descriptions}
+
+CURRENT UI STATE:
+{ui_xml_summary}
+
+Based on the action executed, execution result, screenshot, and current UI state, determine which (if any) of the pending subgoals have been ACHIEVED in this step."""
+
+# Static part of the subgoal detection prompt, appended to the formatted
+# template in the same request (not formatted, so braces are literal)
+SUBGOAL_DETECTION_RULES = """DETECTION RULES:
+1. A subgoal is achieved if its detection criteria are MET (e.g., UI element visible, action completed)
+2. Be CONSERVATIVE - only mark as achieved if there's clear evidence
+3. Subgoals are typically achieved in order, but not always
+4. Multiple subgoals can be achieved in a single step
+5. If uncertain, do NOT mark as achieved (wait for more evidence)
+
+Examples for Obsidian tasks:
+- Subgoal "Obsidian app opened" is achieved if Obsidian main screen or vault list is visible in UI state
+- Subgoal "Vault creation initiated" is achieved if tap on create vault button succeeded
+- Subgoal "Note creation initiated" is achieved if action was tap_by_text on 'Create new note' and execution succeeded
+- Subgoal "Title field populated" is achieved if input_text action succeeded with field_type='title' and correct text
+- Subgoal "Body field populated" is achieved if input_text action succeeded with field_type='body' and correct text
+- Subgoal "Settings accessed" is achieved if UI state shows Settings screen with options like "Appearance", "About", etc.
+- Subgoal "Inside vault view" is achieved if UI shows 'Create new note' button or empty vault screen
+
+Respond with JSON:
+{
+    "achieved_subgoals": [
+        {
+            "id": "subgoal_X",
+            "confidence": 0.95,
+            "reason": "Brief explanation of why this subgoal is achieved"
+        },
+        ...
+    ]
+}
+
+If NO subgoals were achieved, return empty list:
+{
+    "achieved_subgoals": []
+}
+
+Respond with valid JSON only:"""
+
+ASSERTION_PROMPT_TEMPLATE = """You are verifying a test assertion for a mobile app.
+
+TEST GOAL: {test_goal}
+
+ASSERTION TO VERIFY: {assertion}
+
+CURRENT UI STATE:
+{ui_xml_summary}
+
+Based on the screenshot and UI state, determine if the assertion is TRUE or FALSE.
+
+Respond with JSON:
+{{
+    "assertion_holds": true/false,
+    "explanation": "Brief explanation of why assertion is true or false"
+}}"""
+
+FINAL_STATE_PROMPT_TEMPLATE = """You are verifying the final state of a mobile app test.
+
+TEST GOAL: {test_goal}
+
+The test execution has been marked as complete. Analyze the current UI state to determine if the test goal was ACHIEVED.
+
+CURRENT UI STATE:
+{ui_xml_summary}"""
+
+# Static part of the final state prompt (see SUBGOAL_DETECTION_RULES)
+FINAL_STATE_RULES = """IMPORTANT VERIFICATION RULES:
+1. For note creation with BOTH title AND body:
+   - The title field MUST contain the specified title text (not "Untitled")
+   - The body field MUST contain the specified body text
+   - If EITHER title or body is missing/incorrect, the goal is NOT achieved
+
+2. For vault creation:
+   - Must be INSIDE the vault (seeing "Create new note" or vault content screen)
+   - Not just having clicked the "Create" button
+
+3. For settings/appearance verification:
+   - Must have successfully navigated to the specified settings screen
+   - Must verify the specific property mentioned in the goal
+
+Based on the screenshot and UI state, determine if ALL requirements of the test goal are satisfied.
+
+Respond with JSON:
+{
+    "goal_achieved": true/false,
+    "explanation": "Detailed explanation of why the goal was or was not achieved, including what was found vs what was expected"
+}"""
+
+# Appended to the assertion/final-state prompt so the same call also
+# answers subgoal detection
+SUBGOAL_CHECK_PROMPT_ADDENDUM = """
+
+ALSO determine which (if any) of these pending subgoals have been ACHIEVED by this step.
+
+ACTION EXECUTED: {action_type} - {action_desc}
+EXECUTION SUCCESS: {exec_success}
+EXECUTION MESSAGE: {exec_message}
+
+PENDING SUBGOALS:
+{pending_descriptions}
+
+Be CONSERVATIVE - only mark a subgoal as achieved if its detection criteria are clearly met; if uncertain, do NOT mark it.
+
+Include this field in the same JSON object (empty list if none were achieved):
+    "achieved_subgoals": [
+        {{
+            "id": "subgoal_X",
+            "confidence": 0.95,
+            "reason": "Brief explanation of why this subgoal is achieved"
+        }}
+    ]"""
+
+# Layout for format_verdict
+_SEP = "=" * 60
+_VERDICT_TEMPLATE = "{sep}\nTEST VERDICT: {verdict}\n{sep}\nStep: {step}\nReason: {reason}\n{details}{sep}"
+
 
 class VerdictType(Enum):
     """Test verdict types."""
@@ -23,7 +216,7 @@ class VerdictType(Enum):
     RUNNING = "RUNNING"  # Still in progress
 
 
-@dataclass
+@dataclass(slots=True)
 class TestVerdict:
     """Test execution verdict."""
     verdict: VerdictType
@@ -41,6 +234,15 @@ class SupervisorAgent:
     Distinguishes between failed actions and failed assertions.
     """
 
+    # Maximum cached LLM verification responses (LRU)
+    RESPONSE_CACHE_SIZE = 128
+    # Maximum screenshot paths whose digests are remembered (LRU)
+    SCREENSHOT_DIGEST_CACHE_SIZE = 64
+    # Maximum UI summary characters embedded in a verification prompt
+    MAX_UI_SUMMARY_CHARS = 4096
+    # Actions that cannot achieve a subgoal when the UI did not change
+    _NO_OP_ACTIONS = frozenset({"wait", "swipe"})
+
     def __init__(
         self,
         llm_client: GeminiClient,
@@ -61,6 +263,59 @@ class SupervisorAgent:
         self.max_steps = max_steps
         self.subgoal_decomposition = subgoal_decomposition
         self.reward_calculator = reward_calculator
+        # Exact-match cache of verification responses keyed on prompt,
+        # screenshot digest and temperature
+        self._cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self._screenshot_digests: "OrderedDict[str, Tuple[Tuple[int, int], bytes]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Digest of the UI summary seen by the previous evaluate_step call
+        self._last_summary_hash: Optional[bytes] = None
+
+    def start_test(
+        self,
+        subgoal_decomposition: Optional[SubgoalDecomposition],
+        reward_calculator: Optional[RewardCalculator]
+    ):
+        """
+        Reset per-test state before the first step of a new test.
+
+        Args:
+            subgoal_decomposition: Subgoal decomposition for the new test
+            reward_calculator: Reward calculator for the new test
+        """
+        self.subgoal_decomposition = subgoal_decomposition
+        self.reward_calculator = reward_calculator
+        # The first step of a test is never "UI unchanged", even if the
+        # previous test ended on the same screen
+        self._last_summary_hash = None
+
+    def ends_test(
+        self,
+        step_number: int,
+        action: Dict[str, Any],
+        execution_result: ExecutionResult
+    ) -> bool:
+        """
+        Tell whether evaluate_step can return a final verdict for a step.
+
+        Decided without any LLM call, so the runner can keep working on the
+        next step while a step that must be RUNNING is still being scored.
+        Mirrors the early returns of evaluate_step.
+
+        Args:
+            step_number: Step number that will be evaluated
+            action: Action that was attempted
+            execution_result: Result of action execution
+
+        Returns:
+            False if the verdict is certain to be RUNNING
+        """
+        action_type = action.get("action_type")
+        return (
+            step_number >= self.max_steps
+            or (not execution_result.success and action_type != "assert")
+            or action_type in ("done", "assert")
+        )
 
     def evaluate_step(
         self,
@@ -88,6 +343,10 @@ class SupervisorAgent:
         action_type = action.get("action_type")
         action_desc = action.get("description", "Unknown action")
 
+        summary_hash = hashlib.blake2b(ui_xml_summary.encode('utf-8'), digest_size=16).digest()
+        ui_unchanged = summary_hash == self._last_summary_hash
+        self._last_summary_hash = summary_hash
+
         # Check if max steps exceeded
         if step_number >= self.max_steps:
             return TestVerdict(
@@ -125,44 +384,39 @@ class SupervisorAgent:
 
         # Handle "done" action - test completion
         if action_type == "done":
-            verdict = self._verify_final_state(
-                test_goal=test_goal,
-                step_number=step_number,
-                screenshot_path=screenshot_path,
-                ui_xml_summary=ui_xml_summary
-            )
-            # Add subgoal detection for final state
-            subgoals_achieved = []
-            step_reward = None
-            if self.subgoal_decomposition and self.reward_calculator:
-                subgoals_achieved = self.detect_subgoals_achieved(
-                    step_number=step_number,
-                    action=action,
-                    execution_result=execution_result,
+            return self._verify_with_subgoals(
+                self._verify_final_state_core,
+                dict(
+                    test_goal=test_goal,
                     screenshot_path=screenshot_path,
                     ui_xml_summary=ui_xml_summary
-                )
-                step_reward = self.reward_calculator.calculate_step_reward(
-                    step_number=step_number,
-                    subgoals_achieved_this_step=subgoals_achieved
-                )
-            verdict.subgoals_achieved_this_step = subgoals_achieved
-            verdict.step_reward = step_reward
-            return verdict
+                ),
+                step_number, action, execution_result, ui_xml_summary
+            )
 
         # Handle assertion action
         if action_type == "assert":
-            verdict = self._verify_assertion(
-                test_goal=test_goal,
-                assertion=action.get("params", {}).get("condition", action_desc),
-                step_number=step_number,
-                screenshot_path=screenshot_path,
-                ui_xml_summary=ui_xml_summary
+            return self._verify_with_subgoals(
+                self._verify_assertion_core,
+                dict(
+                    test_goal=test_goal,
+                    assertion=action.get("params", {}).get("condition", action_desc),
+                    screenshot_path=screenshot_path,
+                    ui_xml_summary=ui_xml_summary
+                ),
+                step_number, action, execution_result, ui_xml_summary
             )
-            # Add subgoal detection and reward calculation for assertions too
-            subgoals_achieved = []
-            step_reward = None
-            if self.subgoal_decomposition and self.reward_calculator:
+
+        # Regular action succeeded, continue
+        # NEW: Detect subgoals achieved and calculate rewards
+        subgoals_achieved = []
+        step_reward = None
+
+        if self.subgoal_decomposition and self.reward_calculator:
+            # A wait/swipe that left the UI untouched gives no new evidence
+            if ui_unchanged and action_type in self._NO_OP_ACTIONS:
+                logger.debug("UI unchanged after %s; skipping subgoal detection", action_type)
+            else:
                 subgoals_achieved = self.detect_subgoals_achieved(
                     step_number=step_number,
                     action=action,
@@ -170,38 +424,81 @@ class SupervisorAgent:
                     screenshot_path=screenshot_path,
                     ui_xml_summary=ui_xml_summary
                 )
-                step_reward = self.reward_calculator.calculate_step_reward(
-                    step_number=step_number,
-                    subgoals_achieved_this_step=subgoals_achieved
-                )
-            verdict.subgoals_achieved_this_step = subgoals_achieved
-            verdict.step_reward = step_reward
-            return verdict
 
-        # Regular action succeeded, continue
-        # NEW: Detect subgoals achieved and calculate rewards
+            # Calculate step reward
+            step_reward = self.reward_calculator.calculate_step_reward(
+                step_number=step_number,
+                subgoals_achieved_this_step=subgoals_achieved
+            )
+
+        return TestVerdict(
+            verdict=VerdictType.RUNNING,
+            reason=f"Step {step_number} completed: {action_desc}",
+            step_number=step_number,
+            subgoals_achieved_this_step=subgoals_achieved,
+            step_reward=step_reward
+        )
+
+    def _verify_with_subgoals(
+        self,
+        verify,
+        verify_kwargs: Dict[str, Any],
+        step_number: int,
+        action: Dict[str, Any],
+        execution_result: ExecutionResult,
+        ui_xml_summary: str
+    ) -> TestVerdict:
+        """
+        Run an assert/done verification that also detects subgoals.
+
+        Subgoals not settled by the rule table are appended to the
+        verification prompt, so one LLM call answers both questions.
+
+        Args:
+            verify: _verify_assertion_core or _verify_final_state_core
+            verify_kwargs: Keyword arguments for verify
+            step_number: Current step number
+            action: Action that was executed
+            execution_result: Result of execution
+            ui_xml_summary: UI state summary
+
+        Returns:
+            The verification verdict with subgoals and step reward attached
+        """
         subgoals_achieved = []
         step_reward = None
+        tracking = bool(self.subgoal_decomposition and self.reward_calculator)
 
-        if self.subgoal_decomposition and self.reward_calculator:
-            subgoals_achieved = self.detect_subgoals_achieved(
-                step_number=step_number,
-                action=action,
-                execution_result=execution_result,
-                screenshot_path=screenshot_path,
-                ui_xml_summary=ui_xml_summary
+        remaining = []
+        if tracking:
+            subgoals_achieved, remaining = self._apply_subgoal_rules(
+                step_number, action, execution_result, ui_xml_summary
+            )
+        subgoal_context = ""
+        if remaining:
+            subgoal_context = SUBGOAL_CHECK_PROMPT_ADDENDUM.format(
+                action_type=action.get('action_type'),
+                action_desc=action.get('description'),
+                exec_success=execution_result.success,
+                exec_message=execution_result.message,
+                pending_descriptions=self.subgoal_decomposition.describe_pending()
             )
 
-            # Calculate step reward
+        verdict_type, reason, details, result = verify(**verify_kwargs, subgoal_context=subgoal_context)
+
+        if tracking:
+            if subgoal_context:
+                subgoals_achieved.extend(self._record_subgoal_results(result, step_number))
             step_reward = self.reward_calculator.calculate_step_reward(
                 step_number=step_number,
                 subgoals_achieved_this_step=subgoals_achieved
             )
 
         return TestVerdict(
-            verdict=VerdictType.RUNNING,
-            reason=f"Step {step_number} completed: {action_desc}",
+            verdict=verdict_type,
+            reason=reason,
             step_number=step_number,
+            details=details,
             subgoals_achieved_this_step=subgoals_achieved,
             step_reward=step_reward
         )
@@ -230,251 +527,296 @@ class SupervisorAgent:
         if not self.subgoal_decomposition:
             return []
 
-        achieved_subgoals = []
-        pending_subgoals = [
-            sg for sg in self.subgoal_decomposition.subgoals
-            if sg.status == SubgoalStatus.PENDING
-        ]
-
+        # Deterministic rules first; only unmatched subgoals go to the LLM
+        achieved_subgoals, pending_subgoals = self._apply_subgoal_rules(
+            step_number, action, execution_result, ui_xml_summary
+        )
         if not pending_subgoals:
-            return []
-
-        # Build context for LLM detection
-        pending_descriptions = "\n".join([
-            f"- {sg.id}: {sg.description} (Detection: {sg.detection_criteria})"
-            for sg in pending_subgoals
-        ])
-
-        prompt = f"""You are evaluating whether any pending subgoals were achieved in this test step.
-
-ACTION EXECUTED: {action.get('action_type')} - {action.get('description')}
-EXECUTION SUCCESS: {execution_result.success}
-EXECUTION MESSAGE: {execution_result.message}
-
-PENDING SUBGOALS:
-{pending_descriptions}
-
-CURRENT UI STATE:
-{ui_xml_summary}
+            return achieved_subgoals
 
-Based on the action executed, execution result, screenshot, and current UI state, determine which (if any) of the pending subgoals have been ACHIEVED in this step.
+        prompt = SUBGOAL_DETECTION_PROMPT_TEMPLATE.format(
+            action_type=action.get('action_type'),
+            action_desc=action.get('description'),
+            exec_success=execution_result.success,
+            exec_message=execution_result.message,
+            pending_descriptions=self.subgoal_decomposition.describe_pending(),
+            ui_xml_summary=self._prompt_summary(ui_xml_summary)
+        )
 
-DETECTION RULES:
-1. A subgoal is achieved if its detection criteria are MET (e.g., UI element visible, action completed)
-2. Be CONSERVATIVE - only mark as achieved if there's clear evidence
-3. Subgoals are typically achieved in order, but not always
-4. Multiple subgoals can be achieved in a single step
-5. If uncertain, do NOT mark as achieved (wait for more evidence)
+        try:
+            result = self._cached_generate_json(
+                prompt=prompt,
+                image_path=screenshot_path,
+                temperature=0.2,
+                rules=SUBGOAL_DETECTION_RULES
+            )
+        except Exception as e:
+            logger.warning("Subgoal detection failed: %s", e)
+            return achieved_subgoals
 
-Examples for Obsidian tasks:
-- Subgoal "Obsidian app opened" is achieved if Obsidian main screen or vault list is visible in UI state
-- Subgoal "Vault creation initiated" is achieved if tap on create vault button succeeded
-- Subgoal "Note creation initiated" is achieved if action was tap_by_text on 'Create new note' and execution succeeded
-- Subgoal "Title field populated" is achieved if input_text action succeeded with field_type='title' and correct text
-- Subgoal "Body field populated" is achieved if input_text action succeeded with field_type='body' and correct text
-- Subgoal "Settings accessed" is achieved if UI state shows Settings screen with options like "Appearance", "About", etc.
-- Subgoal "Inside vault view" is achieved if UI shows 'Create new note' button or empty vault screen
+        achieved_subgoals.extend(self._record_subgoal_results(result, step_number))
+        return achieved_subgoals
 
-Respond with JSON:
-{{
-    "achieved_subgoals": [
-        {{
-            "id": "subgoal_X",
-            "confidence": 0.95,
-            "reason": "Brief explanation of why this subgoal is achieved"
-        }},
-        ...
-    ]
-}}
+    def _apply_subgoal_rules(
+        self,
+        step_number: int,
+        action: Dict[str, Any],
+        execution_result: ExecutionResult,
+        ui_xml_summary: str
+    ) -> Tuple[List[str], List[Subgoal]]:
+        """
+        Mark pending subgoals achieved by the deterministic rule table.
 
-If NO subgoals were achieved, return empty list:
-{{
-    "achieved_subgoals": []
-}}
+        Returns:
+            Tuple of (IDs achieved by rules, subgoals still pending)
+        """
+        decomposition = self.subgoal_decomposition
+        achieved_subgoals = []
+        remaining = []
+        ui_lower = ui_xml_summary.lower()
+        for sg in decomposition.pending_subgoals():
+            reason = self._match_subgoal_rule(sg, action, execution_result, ui_lower)
+            if reason is None:
+                remaining.append(sg)
+                continue
+            decomposition.mark_achieved(sg.id, step_number, 1.0)
+            achieved_subgoals.append(sg.id)
+            logger.info("  ✓ Subgoal achieved: %s (rule: %s)", sg.description, reason)
+        return achieved_subgoals, remaining
+
+    def _record_subgoal_results(self, result: Dict[str, Any], step_number: int) -> List[str]:
+        """
+        Apply the "achieved_subgoals" list of an LLM response.
 
-Respond with valid JSON only:"""
+        Args:
+            result: Parsed LLM response
+            step_number: Current step number
 
+        Returns:
+            IDs of subgoals newly marked achieved
+        """
+        achieved_subgoals = []
         try:
-            result = self.llm.generate_json(
-                prompt=prompt,
-                image_path=screenshot_path,
-                temperature=0.2
-            )
-
-            for achieved in result.get("achieved_subgoals", []):
+            for achieved in result.get("achieved_subgoals") or []:
                 subgoal_id = achieved.get("id")
                 confidence = achieved.get("confidence", 0.0)
-                reason = achieved.get("reason", "")
-
-                # Find and update the subgoal
-                for sg in self.subgoal_decomposition.subgoals:
-                    if sg.id == subgoal_id and sg.status == SubgoalStatus.PENDING:
-                        sg.status = SubgoalStatus.ACHIEVED
-                        sg.achieved_at_step = step_number
-                        sg.confidence = confidence
-                        achieved_subgoals.append(subgoal_id)
-                        print(f"  ✓ Subgoal achieved: {sg.description} (confidence: {confidence:.2f})")
-                        break
-
-            return achieved_subgoals
 
+                sg = self.subgoal_decomposition.mark_achieved(subgoal_id, step_number, confidence)
+                if sg is not None:
+                    achieved_subgoals.append(subgoal_id)
+                    logger.info("  ✓ Subgoal achieved: %s (confidence: %.2f)", sg.description, confidence)
         except Exception as e:
-            print(f"  Warning: Subgoal detection failed: {e}")
-            return []
+            logger.warning("Subgoal detection failed: %s", e)
+        return achieved_subgoals
 
-    def _verify_assertion(
+    @staticmethod
+    def _match_subgoal_rule(
+        subgoal: Subgoal,
+        action: Dict[str, Any],
+        execution_result: ExecutionResult,
+        ui_lower: str
+    ) -> Optional[str]:
+        """
+        Check a pending subgoal against the deterministic rule table.
+
+        Args:
+            subgoal: Pending subgoal
+            action: Action that was executed
+            execution_result: Result of action execution
+            ui_lower: Lowercased post-action UI summary
+
+        Returns:
+            Reason string if a rule marks the subgoal achieved, else None
+        """
+        description = subgoal.description.lower()
+        for phrase, predicate, reason in _SUBGOAL_RULES:
+            if phrase in description and predicate(action, execution_result, ui_lower):
+                return reason
+        return None
+
+    def _verify_assertion_core(
         self,
         test_goal: str,
         assertion: str,
-        step_number: int,
         screenshot_path: str,
-        ui_xml_summary: str
-    ) -> TestVerdict:
+        ui_xml_summary: str,
+        subgoal_context: str = ""
+    ) -> Tuple[VerdictType, str, str, Dict[str, Any]]:
         """
         Verify an assertion using LLM.
 
         Args:
             test_goal: Test objective
             assertion: Assertion to verify
-            step_number: Current step number
             screenshot_path: Path to screenshot
             ui_xml_summary: UI state summary
+            subgoal_context: Optional SUBGOAL_CHECK_PROMPT_ADDENDUM to answer
+                in the same call
 
         Returns:
-            TestVerdict indicating if assertion passed or failed
+            Tuple of (verdict type, reason, details, raw LLM response); the
+            verdict is RUNNING if the assertion holds, FAIL_ASSERTION otherwise
         """
-        prompt = f"""You are verifying a test assertion for a mobile app.
-
-TEST GOAL: {test_goal}
-
-ASSERTION TO VERIFY: {assertion}
-
-CURRENT UI STATE:
-{ui_xml_summary}
-
-Based on the screenshot and UI state, determine if the assertion is TRUE or FALSE.
-
-Respond with JSON:
-{{
-    "assertion_holds": true/false,
-    "explanation": "Brief explanation of why assertion is true or false"
-}}"""
+        prompt = ASSERTION_PROMPT_TEMPLATE.format(
+            test_goal=test_goal,
+            assertion=assertion,
+            ui_xml_summary=self._prompt_summary(ui_xml_summary)
+        ) + subgoal_context
 
         try:
-            result = self.llm.generate_json(
+            result = self._cached_generate_json(
                 prompt=prompt,
                 image_path=screenshot_path,
                 temperature=0.2
             )
-
-            assertion_holds = result.get("assertion_holds", False)
             explanation = result.get("explanation", "No explanation provided")
-
-            if assertion_holds:
-                return TestVerdict(
-                    verdict=VerdictType.RUNNING,
-                    reason=f"Assertion passed: {assertion}",
-                    step_number=step_number,
-                    details=explanation
-                )
-            else:
-                return TestVerdict(
-                    verdict=VerdictType.FAIL_ASSERTION,
-                    reason=f"Assertion failed: {assertion}",
-                    step_number=step_number,
-                    details=explanation
-                )
-
+            assertion_holds = result.get("assertion_holds", False)
         except Exception as e:
-            return TestVerdict(
-                verdict=VerdictType.FAIL_ASSERTION,
-                reason=f"Failed to verify assertion: {assertion}",
-                step_number=step_number,
-                details=f"LLM verification error: {str(e)}"
+            return (
+                VerdictType.FAIL_ASSERTION,
+                f"Failed to verify assertion: {assertion}",
+                f"LLM verification error: {str(e)}",
+                {}
             )
 
-    def _verify_final_state(
+        if assertion_holds:
+            return VerdictType.RUNNING, f"Assertion passed: {assertion}", explanation, result
+        return VerdictType.FAIL_ASSERTION, f"Assertion failed: {assertion}", explanation, result
+
+    def _verify_final_state_core(
         self,
         test_goal: str,
-        step_number: int,
         screenshot_path: str,
-        ui_xml_summary: str
-    ) -> TestVerdict:
+        ui_xml_summary: str,
+        subgoal_context: str = ""
+    ) -> Tuple[VerdictType, str, str, Dict[str, Any]]:
         """
         Verify final state when test is marked as done.
 
         Args:
             test_goal: Test objective
-            step_number: Final step number
             screenshot_path: Path to final screenshot
             ui_xml_summary: Final UI state summary
+            subgoal_context: Optional SUBGOAL_CHECK_PROMPT_ADDENDUM to answer
+                in the same call
 
         Returns:
-            TestVerdict indicating PASS or FAIL_ASSERTION
+            Tuple of (verdict type, reason, details, raw LLM response); the
+            verdict is PASS or FAIL_ASSERTION
         """
-        prompt = f"""You are verifying the final state of a mobile app test.
-
-TEST GOAL: {test_goal}
-
-The test execution has been marked as complete. Analyze the current UI state to determine if the test goal was ACHIEVED.
-
-CURRENT UI STATE:
-{ui_xml_summary}
-
-IMPORTANT VERIFICATION RULES:
-1. For note creation with BOTH title AND body:
-   - The title field MUST contain the specified title text (not "Untitled")
-   - The body field MUST contain the specified body text
-   - If EITHER title or body is missing/incorrect, the goal is NOT achieved
-
-2. For vault creation:
-   - Must be INSIDE the vault (seeing "Create new note" or vault content screen)
-   - Not just having clicked the "Create" button
-
-3. For settings/appearance verification:
-   - Must have successfully navigated to the specified settings screen
-   - Must verify the specific property mentioned in the goal
-
-Based on the screenshot and UI state, determine if ALL requirements of the test goal are satisfied.
-
-Respond with JSON:
-{{
-    "goal_achieved": true/false,
-    "explanation": "Detailed explanation of why the goal was or was not achieved, including what was found vs what was expected"
-}}"""
+        prompt = FINAL_STATE_PROMPT_TEMPLATE.format(
+            test_goal=test_goal,
+            ui_xml_summary=self._prompt_summary(ui_xml_summary)
+        )
 
         try:
-            result = self.llm.generate_json(
+            result = self._cached_generate_json(
                 prompt=prompt,
                 image_path=screenshot_path,
-                temperature=0.2
+                temperature=0.2,
+                rules=FINAL_STATE_RULES,
+                addendum=subgoal_context
             )
-
-            goal_achieved = result.get("goal_achieved", False)
             explanation = result.get("explanation", "No explanation provided")
+            goal_achieved = result.get("goal_achieved", False)
+        except Exception as e:
+            return (
+                VerdictType.FAIL_ASSERTION,
+                "Failed to verify final state",
+                f"LLM verification error: {str(e)}",
+                {}
+            )
 
-            if goal_achieved:
-                return TestVerdict(
-                    verdict=VerdictType.PASS,
-                    reason="Test goal achieved",
-                    step_number=step_number,
-                    details=explanation
-                )
-            else:
-                return TestVerdict(
-                    verdict=VerdictType.FAIL_ASSERTION,
-                    reason="Test goal not achieved",
-                    step_number=step_number,
-                    details=explanation
-                )
+        if goal_achieved:
+            return VerdictType.PASS, "Test goal achieved", explanation, result
+        return VerdictType.FAIL_ASSERTION, "Test goal not achieved", explanation, result
 
-        except Exception as e:
-            return TestVerdict(
-                verdict=VerdictType.FAIL_ASSERTION,
-                reason="Failed to verify final state",
-                step_number=step_number,
-                details=f"LLM verification error: {str(e)}"
+    def _prompt_summary(self, ui_xml_summary: str) -> str:
+        """Truncate a UI summary to MAX_UI_SUMMARY_CHARS for a prompt."""
+        if len(ui_xml_summary) > self.MAX_UI_SUMMARY_CHARS:
+            logger.debug(
+                "Truncating UI summary from %d to %d characters",
+                len(ui_xml_summary), self.MAX_UI_SUMMARY_CHARS
             )
+        return truncate_summary(ui_xml_summary, self.MAX_UI_SUMMARY_CHARS)
+
+    def _screenshot_digest(self, image_path: str) -> bytes:
+        """
+        Get the SHA-256 digest of a screenshot, hashing each file only once.
+
+        The file's mtime and size are stored alongside the digest so a
+        screenshot rewritten at the same path is hashed again.
+        """
+        stat = os.stat(image_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._cache_lock:
+            cached = self._screenshot_digests.get(image_path)
+            if cached and cached[0] == signature:
+                self._screenshot_digests.move_to_end(image_path)
+                return cached[1]
+
+        with open(image_path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).digest()
+        with self._cache_lock:
+            self._screenshot_digests[image_path] = (signature, digest)
+            self._screenshot_digests.move_to_end(image_path)
+            if len(self._screenshot_digests) > self.SCREENSHOT_DIGEST_CACHE_SIZE:
+                self._screenshot_digests.popitem(last=False)
+        return digest
+
+    def _cached_generate_json(
+        self,
+        prompt: str,
+        image_path: Optional[str],
+        temperature: float,
+        rules: Optional[str] = None,
+        addendum: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Call llm.generate_json, reusing the response for identical requests.
+
+        The full prompt is prompt + rules + addendum. The *_RULES blocks are
+        a few hundred tokens, well under Gemini's context-caching minimum, so
+        they are always sent inline.
+
+        Args:
+            prompt: Verification prompt (dynamic part)
+            image_path: Screenshot sent with the prompt
+            temperature: Sampling temperature
+            rules: Optional static instructions (a *_RULES constant)
+            addendum: Optional text sent after the rules
+
+        Returns:
+            Parsed JSON response (shared with the cache; do not mutate)
+        """
+        full_prompt = f"{prompt}\n\n{rules}{addendum}" if rules else prompt + addendum
+
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(full_prompt.encode('utf-8'))
+        hasher.update(b'\0')
+        if image_path:
+            hasher.update(self._screenshot_digest(image_path))
+        hasher.update(b'\0')
+        hasher.update(repr(temperature).encode('ascii'))
+        key = hasher.digest()
+
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        # Errors propagate uncached so the next call retries the LLM
+        result = self.llm.generate_json(
+            prompt=full_prompt,
+            image_path=image_path,
+            temperature=temperature
+        )
+        with self._cache_lock:
+            self._cache[key] = result
+            if len(self._cache) > self.RESPONSE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
 
     def format_verdict(self, verdict: TestVerdict) -> str:
         """
@@ -486,17 +828,11 @@ Respond with JSON:
         Returns:
             Formatted verdict string
         """
-        lines = [
-            f"{'='*60}",
-            f"TEST VERDICT: {verdict.verdict.value}",
-            f"{'='*60}",
-            f"Step: {verdict.step_number}",
-            f"Reason: {verdict.reason}",
-        ]
-
-        if verdict.details:
-            lines.append(f"Details: {verdict.details}")
-
-        lines.append('='*60)
-
-        return '\n'.join(lines)
+        details = f"Details: {verdict.details}\n" if verdict.details else ""
+        return _VERDICT_TEMPLATE.format(
+            sep=_SEP,
+            verdict=verdict.verdict.value,
+            step=verdict.step_number,
+            reason=verdict.reason,
+            details=details
+        )
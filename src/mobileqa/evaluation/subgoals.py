@@ -4,11 +4,138 @@ Subgoal tracking and reward calculation for mobile QA tests.
 This module provides LLM-based subgoal decomposition, automatic achievement detection,
 and comprehensive reward scoring inspired by android_world_agents.
 """
+from collections import OrderedDict
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import List, Optional, Dict, Any
 from enum import Enum
-from datetime import datetime
+import hashlib
 import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from ..tools.uixml import truncate_summary
+
+try:
+    from PIL import Image
+except ImportError:  # optional: screenshots are then keyed by exact bytes
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+
+def _now_iso() -> str:
+    """Local time as an ISO 8601 string with microseconds, from one clock read."""
+    now_ns = time.time_ns()
+    seconds, ns = divmod(now_ns, 1_000_000_000)
+    return f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(seconds))}.{ns // 1000:06d}"
+
+
+# Subgoal design principles and examples shared by the single and batch
+# decomposition prompts
+_DECOMPOSITION_GUIDE = """SUBGOAL DESIGN PRINCIPLES:
+1. Each subgoal should be DETECTABLE through UI state changes or specific actions
+2. Subgoals should be SEQUENTIAL (earlier ones typically achieved before later ones)
+3. Subgoals should be ATOMIC (single observable achievement)
+4. Include both ACTION subgoals (e.g., "Open Settings menu") and STATE subgoals (e.g., "Settings screen is visible")
+
+EXAMPLES FOR OBSIDIAN TASKS:
+
+Test Goal: "Open Obsidian, create a new Vault named 'InternVault', and enter the vault"
+Subgoals:
+1. "Obsidian app opened" - Detected when Obsidian main screen or vault list is visible
+2. "Vault creation initiated" - Detected when create vault button/option is tapped
+3. "Storage location selected" - Detected when folder picker appears or location is confirmed
+4. "Vault name entered" - Detected when 'InternVault' text is typed in name field
+5. "Vault creation confirmed" - Detected when create/confirm button is tapped
+6. "Inside vault view" - Detected when 'Create new note' button appears or empty vault screen shown
+
+Test Goal: "Create a new note titled 'Meeting Notes' and type the text 'Daily Standup' into the body"
+Subgoals:
+1. "Note creation initiated" - Detected when 'Create new note' button is tapped
+2. "Note editor opened" - Detected when note editing screen with title and body fields is visible
+3. "Title field populated" - Detected when 'Meeting Notes' is typed in title field (top field)
+4. "Focus moved to body" - Detected when cursor moves to body field after title input
+5. "Body field populated" - Detected when 'Daily Standup' is typed in body field
+6. "Note content saved" - Detected when note shows both title and body correctly
+
+Test Goal: "Go to Settings and verify that the 'Appearance' tab icon is the color Red"
+Subgoals:
+1. "Sidebar opened" - Detected when sidebar menu appears (gear icon or menu visible)
+2. "Settings accessed" - Detected when Settings option is tapped
+3. "Settings screen visible" - Detected when Settings menu with options appears
+4. "Appearance section visible" - Detected when Appearance option is shown in Settings
+5. "Appearance verification" - Detected when checking Appearance icon color via assert action
+
+Test Goal: "Find and click the 'Print to PDF' button in the main file menu"
+Subgoals:
+1. "Note opened" - Detected when a note is open and visible
+2. "File menu accessed" - Detected when 3-dot menu or more options is tapped
+3. "Menu options visible" - Detected when menu options are displayed
+4. "Search for Print option" - Detected when looking through menu items for 'Print to PDF'
+5. "Report not found" - Detected when 'fail' action is used (Print to PDF doesn't exist in mobile)
+
+"""
+
+# Decomposition prompts, filled with str.format()
+DECOMPOSITION_PROMPT_TEMPLATE = """You are analyzing a mobile app test goal to break it down into measurable intermediate subgoals.
+
+TEST GOAL:
+{test_goal}
+
+INITIAL UI STATE:
+{ui_xml_summary}
+
+Your task is to decompose this test goal into 3-7 concrete, measurable subgoals that represent progress toward the final goal.
+
+""" + _DECOMPOSITION_GUIDE + """For the given test goal, provide a JSON response with this structure:
+{{
+    "subgoals": [
+        {{
+            "id": "subgoal_1",
+            "description": "Brief description of what is achieved",
+            "detection_criteria": "How to detect this subgoal (e.g., 'UI shows X', 'Action Y executed', 'Text Z visible')"
+        }},
+        ...
+    ]
+}}
+
+Respond with valid JSON only:"""
+
+BATCH_DECOMPOSITION_PROMPT_TEMPLATE = """You are analyzing several mobile app test goals to break each one down into measurable intermediate subgoals.
+
+TEST GOALS:
+{goals}
+
+INITIAL UI STATE (shared by all goals):
+{ui_xml_summary}
+
+Your task is to decompose EACH test goal into 3-7 concrete, measurable subgoals that represent progress toward that goal.
+
+""" + _DECOMPOSITION_GUIDE + """For EACH test goal, provide one entry in a JSON response with this structure:
+{{
+    "decompositions": [
+        {{
+            "goal_index": 1,
+            "subgoals": [
+                {{
+                    "id": "subgoal_1",
+                    "description": "Brief description of what is achieved",
+                    "detection_criteria": "How to detect this subgoal (e.g., 'UI shows X', 'Action Y executed', 'Text Z visible')"
+                }},
+                ...
+            ]
+        }},
+        ...
+    ]
+}}
+
+goal_index is the number of the goal in the TEST GOALS list.
+
+Respond with valid JSON only:"""
 
 
 class SubgoalStatus(Enum):
@@ -20,7 +147,7 @@ class SubgoalStatus(Enum):
     SKIPPED = "skipped"
 
 
-@dataclass
+@dataclass(slots=True)
 class Subgoal:
     """Represents a single subgoal in the test execution."""
     id: str  # e.g., "subgoal_1", "subgoal_2"
@@ -37,9 +164,66 @@ class SubgoalDecomposition:
     test_goal: str
     subgoals: List[Subgoal] = field(default_factory=list)
     decomposition_timestamp: Optional[str] = None
+    # Pending subgoals by id, in decomposition order (ids are assumed unique)
+    _pending: Dict[str, Subgoal] = field(init=False, repr=False, compare=False)
+    # describe_pending() result, reset whenever a subgoal is marked achieved
+    _pending_text: Optional[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._pending = {}
+        self._pending_text = None
+        for sg in self.subgoals:
+            if sg.status is SubgoalStatus.PENDING:
+                self._pending.setdefault(sg.id, sg)
+
+    def pending_subgoals(self) -> List[Subgoal]:
+        """Return pending subgoals in decomposition order."""
+        return list(self._pending.values())
+
+    def describe_pending(self) -> str:
+        """
+        Format pending subgoals as prompt lines.
 
+        The text is reused until a subgoal is marked achieved.
 
-@dataclass
+        Returns:
+            One "- id: description (Detection: criteria)" line per subgoal
+        """
+        if self._pending_text is None:
+            self._pending_text = "\n".join(
+                f"- {sg.id}: {sg.description} (Detection: {sg.detection_criteria})"
+                for sg in self._pending.values()
+            )
+        return self._pending_text
+
+    def mark_achieved(
+        self,
+        subgoal_id: str,
+        step_number: int,
+        confidence: float
+    ) -> Optional[Subgoal]:
+        """
+        Mark a pending subgoal as achieved.
+
+        Args:
+            subgoal_id: ID of the subgoal
+            step_number: Step at which it was achieved
+            confidence: Detection confidence (0.0-1.0)
+
+        Returns:
+            The updated subgoal, or None if no pending subgoal has that id
+        """
+        sg = self._pending.pop(subgoal_id, None)
+        if sg is None:
+            return None
+        self._pending_text = None
+        sg.status = SubgoalStatus.ACHIEVED
+        sg.achieved_at_step = step_number
+        sg.confidence = confidence
+        return sg
+
+
+@dataclass(slots=True)
 class StepReward:
     """Reward information for a single step."""
     step_number: int
@@ -51,7 +235,7 @@ class StepReward:
     total_subgoals: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class RewardSummary:
     """Final reward summary for test execution."""
     total_steps: int
@@ -68,14 +252,132 @@ class RewardSummary:
 class SubgoalDecomposer:
     """Handles LLM-based subgoal decomposition."""
 
-    def __init__(self, llm_client):
+    # In-process decompositions kept in front of the disk cache
+    MEMORY_CACHE_SIZE = 128
+    # Longest UI summary embedded in a decomposition prompt
+    MAX_UI_SUMMARY_CHARS = 3000
+    TEMPERATURE = 0.3
+
+    def __init__(self, llm_client, cache_dir: Optional[Path] = None):
         """
         Initialize SubgoalDecomposer.
 
         Args:
             llm_client: GeminiClient instance for LLM calls
+            cache_dir: Optional directory caching decompositions across
+                runs (in-memory caching only if None)
         """
         self.llm = llm_client
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._memory_cache: "OrderedDict[str, List[Dict[str, str]]]" = OrderedDict()
+
+    def _cache_key(self, test_goal: str, screenshot_path: str, ui_xml_summary: str) -> Optional[str]:
+        """Content hash of a decomposition request, or None if the screenshot is unreadable."""
+        image_digest = self._image_fingerprint(screenshot_path)
+        if image_digest is None:
+            return None
+        hasher = hashlib.blake2b(digest_size=16)
+        # The prompt templates are part of the key so on-disk entries from
+        # an older prompt wording are not reused
+        for part in (
+            test_goal, ui_xml_summary, str(getattr(self.llm, 'model', '')), repr(self.TEMPERATURE),
+            DECOMPOSITION_PROMPT_TEMPLATE, BATCH_DECOMPOSITION_PROMPT_TEMPLATE
+        ):
+            hasher.update(part.encode('utf-8'))
+            hasher.update(b'\0')
+        hasher.update(image_digest)
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _image_fingerprint(screenshot_path: str) -> Optional[bytes]:
+        """
+        Fingerprint a screenshot for the decomposition cache key.
+
+        With Pillow this is a 64-bit difference hash of a 9x8 grayscale
+        thumbnail, so reruns still hit the cache when only small details
+        (status bar clock, cursor blink) differ. Otherwise it is the SHA-256
+        of the file.
+
+        Args:
+            screenshot_path: Screenshot file
+
+        Returns:
+            Fingerprint bytes, or None if the file cannot be read
+        """
+        if Image is not None:
+            try:
+                with Image.open(screenshot_path) as img:
+                    pixels = list(img.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+                bits = 0
+                for row in range(8):
+                    for col in range(8):
+                        i = row * 9 + col
+                        bits = (bits << 1) | (pixels[i] > pixels[i + 1])
+                return b'dhash:' + bits.to_bytes(8, 'big')
+            except Exception:
+                pass
+        try:
+            with open(screenshot_path, 'rb') as f:
+                return hashlib.sha256(f.read()).digest()
+        except OSError:
+            return None
+
+    def _load_cached(self, key: str) -> Optional[List[Dict[str, str]]]:
+        """Look up cached subgoal data in memory, then on disk."""
+        data = self._memory_cache.get(key)
+        if data is not None:
+            self._memory_cache.move_to_end(key)
+            return data
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self.cache_dir / f"{key}.json", 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not (isinstance(data, list) and all(
+            isinstance(sg_data, dict) and set(sg_data) == {'id', 'description', 'detection_criteria'}
+            for sg_data in data
+        )):
+            return None
+        self._remember(key, data)
+        return data
+
+    def _remember(self, key: str, data: List[Dict[str, str]]):
+        self._memory_cache[key] = data
+        self._memory_cache.move_to_end(key)
+        if len(self._memory_cache) > self.MEMORY_CACHE_SIZE:
+            self._memory_cache.popitem(last=False)
+
+    def _store_cached(self, key: str, data: List[Dict[str, str]]):
+        """Cache subgoal data in memory and write it atomically to disk."""
+        self._remember(key, data)
+        if self.cache_dir is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile('w', dir=self.cache_dir, suffix='.tmp', delete=False) as f:
+                json.dump(data, f)
+            os.replace(f.name, self.cache_dir / f"{key}.json")
+        except OSError as e:
+            logger.warning("Could not write subgoal cache: %s", e)
+
+    @staticmethod
+    def _build_decomposition(test_goal: str, data: List[Dict[str, str]]) -> SubgoalDecomposition:
+        """Create a fresh (all pending) decomposition from cached subgoal data."""
+        return SubgoalDecomposition(
+            test_goal=test_goal,
+            subgoals=[
+                Subgoal(
+                    id=sys.intern(str(sg_data["id"])),
+                    description=sg_data["description"],
+                    detection_criteria=sg_data["detection_criteria"],
+                    status=SubgoalStatus.PENDING
+                )
+                for sg_data in data
+            ],
+            decomposition_timestamp=_now_iso()
+        )
 
     def decompose_test_goal(
         self,
@@ -94,98 +396,29 @@ class SubgoalDecomposer:
         Returns:
             SubgoalDecomposition with list of subgoals
         """
-        prompt = f"""You are analyzing a mobile app test goal to break it down into measurable intermediate subgoals.
-
-TEST GOAL:
-{test_goal}
-
-INITIAL UI STATE:
-{ui_xml_summary}
-
-Your task is to decompose this test goal into 3-7 concrete, measurable subgoals that represent progress toward the final goal.
-
-SUBGOAL DESIGN PRINCIPLES:
-1. Each subgoal should be DETECTABLE through UI state changes or specific actions
-2. Subgoals should be SEQUENTIAL (earlier ones typically achieved before later ones)
-3. Subgoals should be ATOMIC (single observable achievement)
-4. Include both ACTION subgoals (e.g., "Open Settings menu") and STATE subgoals (e.g., "Settings screen is visible")
-
-EXAMPLES FOR OBSIDIAN TASKS:
-
-Test Goal: "Open Obsidian, create a new Vault named 'InternVault', and enter the vault"
-Subgoals:
-1. "Obsidian app opened" - Detected when Obsidian main screen or vault list is visible
-2. "Vault creation initiated" - Detected when create vault button/option is tapped
-3. "Storage location selected" - Detected when folder picker appears or location is confirmed
-4. "Vault name entered" - Detected when 'InternVault' text is typed in name field
-5. "Vault creation confirmed" - Detected when create/confirm button is tapped
-6. "Inside vault view" - Detected when 'Create new note' button appears or empty vault screen shown
-
-Test Goal: "Create a new note titled 'Meeting Notes' and type the text 'Daily Standup' into the body"
-Subgoals:
-1. "Note creation initiated" - Detected when 'Create new note' button is tapped
-2. "Note editor opened" - Detected when note editing screen with title and body fields is visible
-3. "Title field populated" - Detected when 'Meeting Notes' is typed in title field (top field)
-4. "Focus moved to body" - Detected when cursor moves to body field after title input
-5. "Body field populated" - Detected when 'Daily Standup' is typed in body field
-6. "Note content saved" - Detected when note shows both title and body correctly
-
-Test Goal: "Go to Settings and verify that the 'Appearance' tab icon is the color Red"
-Subgoals:
-1. "Sidebar opened" - Detected when sidebar menu appears (gear icon or menu visible)
-2. "Settings accessed" - Detected when Settings option is tapped
-3. "Settings screen visible" - Detected when Settings menu with options appears
-4. "Appearance section visible" - Detected when Appearance option is shown in Settings
-5. "Appearance verification" - Detected when checking Appearance icon color via assert action
-
-Test Goal: "Find and click the 'Print to PDF' button in the main file menu"
-Subgoals:
-1. "Note opened" - Detected when a note is open and visible
-2. "File menu accessed" - Detected when 3-dot menu or more options is tapped
-3. "Menu options visible" - Detected when menu options are displayed
-4. "Search for Print option" - Detected when looking through menu items for 'Print to PDF'
-5. "Report not found" - Detected when 'fail' action is used (Print to PDF doesn't exist in mobile)
-
-For the given test goal, provide a JSON response with this structure:
-{{
-    "subgoals": [
-        {{
-            "id": "subgoal_1",
-            "description": "Brief description of what is achieved",
-            "detection_criteria": "How to detect this subgoal (e.g., 'UI shows X', 'Action Y executed', 'Text Z visible')"
-        }},
-        ...
-    ]
-}}
-
-Respond with valid JSON only:"""
+        # Identical goal, UI and screenshot give the same decomposition
+        cache_key = self._cache_key(test_goal, screenshot_path, ui_xml_summary)
+        cached = self._load_cached(cache_key) if cache_key else None
+        if cached is not None:
+            print("Using cached subgoal decomposition")
+            return self._build_decomposition(test_goal, cached)
+
+        prompt = DECOMPOSITION_PROMPT_TEMPLATE.format(
+            test_goal=test_goal,
+            ui_xml_summary=truncate_summary(ui_xml_summary, self.MAX_UI_SUMMARY_CHARS)
+        )
 
         try:
             result = self.llm.generate_json(
                 prompt=prompt,
                 image_path=screenshot_path,
-                temperature=0.3
+                temperature=self.TEMPERATURE
             )
 
-            subgoals = []
-            for sg_data in result.get("subgoals", []):
-                subgoal = Subgoal(
-                    id=sg_data.get("id", f"subgoal_{len(subgoals)+1}"),
-                    description=sg_data.get("description", ""),
-                    detection_criteria=sg_data.get("detection_criteria", ""),
-                    status=SubgoalStatus.PENDING
-                )
-                subgoals.append(subgoal)
-
-            return SubgoalDecomposition(
-                test_goal=test_goal,
-                subgoals=subgoals,
-                decomposition_timestamp=datetime.now().isoformat()
-            )
+            return self._accept_subgoals(test_goal, cache_key, result.get("subgoals", []))
 
         except Exception as e:
-            print(f"Warning: Subgoal decomposition failed: {e}")
-            print("Falling back to single generic subgoal")
+            logger.warning("Subgoal decomposition failed, falling back to a single generic subgoal: %s", e)
             # Fallback: Create a single generic subgoal
             return SubgoalDecomposition(
                 test_goal=test_goal,
@@ -197,9 +430,110 @@ Respond with valid JSON only:"""
                         status=SubgoalStatus.PENDING
                     )
                 ],
-                decomposition_timestamp=datetime.now().isoformat()
+                decomposition_timestamp=_now_iso()
             )
 
+    def decompose_test_goals_batch(
+        self,
+        test_goals: List[str],
+        screenshot_path: str,
+        ui_xml_summary: str
+    ) -> List[SubgoalDecomposition]:
+        """
+        Decompose several test goals that share an initial state in one LLM call.
+
+        Cached goals are skipped. Goals missing from the batch response (or
+        all of them, if the batch call fails) fall back to
+        decompose_test_goal. Results are cached under the same keys as
+        single decompositions.
+
+        This is for library callers that capture one initial state for
+        several goals. MobileQARunner does not use it: each test's initial
+        state is captured after that test's own app setup, once the previous
+        test has run, so the tests' goals never share a screenshot up front.
+
+        Args:
+            test_goals: High-level test objectives
+            screenshot_path: Initial app screenshot shared by all goals
+            ui_xml_summary: Initial UI state shared by all goals
+
+        Returns:
+            One SubgoalDecomposition per test goal, in input order
+        """
+        decompositions: List[Optional[SubgoalDecomposition]] = [None] * len(test_goals)
+        cache_keys = [self._cache_key(goal, screenshot_path, ui_xml_summary) for goal in test_goals]
+
+        misses = []
+        for i, (goal, key) in enumerate(zip(test_goals, cache_keys)):
+            cached = self._load_cached(key) if key else None
+            if cached is not None:
+                decompositions[i] = self._build_decomposition(goal, cached)
+            else:
+                misses.append(i)
+
+        if len(misses) > 1:
+            prompt = BATCH_DECOMPOSITION_PROMPT_TEMPLATE.format(
+                goals="\n".join(f"{n}. {test_goals[i]}" for n, i in enumerate(misses, 1)),
+                ui_xml_summary=truncate_summary(ui_xml_summary, self.MAX_UI_SUMMARY_CHARS)
+            )
+            try:
+                result = self.llm.generate_json(
+                    prompt=prompt,
+                    image_path=screenshot_path,
+                    temperature=self.TEMPERATURE
+                )
+                for entry in result.get("decompositions", []):
+                    n = entry.get("goal_index")
+                    if isinstance(n, int) and 1 <= n <= len(misses):
+                        i = misses[n - 1]
+                        if decompositions[i] is None:
+                            decompositions[i] = self._accept_subgoals(
+                                test_goals[i], cache_keys[i], entry.get("subgoals", [])
+                            )
+            except Exception as e:
+                logger.warning("Batch subgoal decomposition failed: %s", e)
+
+        return [
+            decomposition if decomposition is not None
+            else self.decompose_test_goal(goal, screenshot_path, ui_xml_summary)
+            for goal, decomposition in zip(test_goals, decompositions)
+        ]
+
+    def _accept_subgoals(
+        self,
+        test_goal: str,
+        cache_key: Optional[str],
+        subgoal_list: List[Dict[str, Any]]
+    ) -> SubgoalDecomposition:
+        """Build a decomposition from the LLM's subgoal list and cache it."""
+        # IDs are interned so the lists repeated in every step reward share
+        # one string; the fallback ID is only formatted when one is missing
+        subgoals = [
+            Subgoal(
+                id=sys.intern(str(sg_data.get("id") or f"subgoal_{index}")),
+                description=sg_data.get("description", ""),
+                detection_criteria=sg_data.get("detection_criteria", ""),
+                status=SubgoalStatus.PENDING
+            )
+            for index, sg_data in enumerate(subgoal_list, start=1)
+        ]
+
+        if cache_key:
+            self._store_cached(cache_key, [
+                {
+                    'id': sg.id,
+                    'description': sg.description,
+                    'detection_criteria': sg.detection_criteria
+                }
+                for sg in subgoals
+            ])
+
+        return SubgoalDecomposition(
+            test_goal=test_goal,
+            subgoals=subgoals,
+            decomposition_timestamp=_now_iso()
+        )
+
 
 class RewardCalculator:
     """Calculates rewards based on steps, subgoals, and completion."""
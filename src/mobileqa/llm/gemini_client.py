@@ -2,34 +2,196 @@
 Gemini LLM client for multimodal mobile QA.
 Uses the official google-genai SDK.
 """
+import atexit
+import hashlib
+import io
 import os
 import json
-import base64
-from pathlib import Path
-from typing import Optional, Dict, Any, List
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
 
 from google import genai
+from google.genai import types
+
+from .response_cache import GeminiCache
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+try:
+    from PIL import Image
+except ImportError:  # optional: screenshots are sent as-is without Pillow
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+
+def _loads(text: str) -> Any:
+    """Parse JSON with orjson when available, falling back to the stdlib."""
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            # The stdlib parser is more lenient (NaN, huge ints)
+            pass
+    return json.loads(text)
+
+
+def _extract_json_object(text: str) -> Optional[str]:
+    """
+    Find the first complete top-level JSON object in free-form text.
+
+    Scans once from the first '{', tracking nesting depth and skipping
+    braces inside string literals, so prose after the object is ignored.
+
+    Args:
+        text: LLM response text
+
+    Returns:
+        The object's source text, or None if no balanced object is found
+    """
+    start = text.find('{')
+    if start < 0:
+        return None
+    depth = 0
+    in_string = False
+    escape = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+# Image MIME types by file extension (PNG by default)
+_MIME_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp'
+}
+
+# One SDK client per API key, shared by every GeminiClient in the process
+# so its HTTP connection pool (and the TLS sessions in it) stays warm
+_CLIENT_POOL: Dict[str, genai.Client] = {}
+_CLIENT_POOL_LOCK = threading.Lock()
+
+
+def _shared_client(api_key: str) -> genai.Client:
+    """Return the pooled SDK client for an API key, creating it on first use."""
+    with _CLIENT_POOL_LOCK:
+        client = _CLIENT_POOL.get(api_key)
+        if client is None:
+            client = _CLIENT_POOL[api_key] = genai.Client(api_key=api_key)
+        return client
+
+
+@atexit.register
+def _close_pooled_clients():
+    """Release the pooled SDK clients' HTTP connections at interpreter exit."""
+    with _CLIENT_POOL_LOCK:
+        clients = list(_CLIENT_POOL.values())
+        _CLIENT_POOL.clear()
+    for client in clients:
+        close = getattr(client, 'close', None)
+        if close:
+            try:
+                close()
+            except Exception:
+                pass
 
 
 class GeminiClient:
     """Client for Google Gemini API using google-genai SDK."""
 
-    def __init__(self, api_key: Optional[str] = None, model: str = "gemini-1.5-flash"):
+    # Number of recently encoded images kept for repeat requests
+    IMAGE_CACHE_SIZE = 4
+    # Gemini downsamples images itself, so larger screenshots are shrunk
+    # to this long edge before upload
+    MAX_IMAGE_EDGE = 1024
+    IMAGE_QUALITY = 80
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gemini-1.5-flash",
+        max_concurrent: int = 2,
+        downscale: bool = True,
+        response_cache_path: Optional[str] = None
+    ):
         """
         Initialize Gemini client.
 
         Args:
             api_key: Gemini API key. If None, reads from GEMINI_API_KEY env var.
             model: Model to use (default: gemini-1.5-flash)
+            max_concurrent: Maximum in-flight requests across threads
+            downscale: Shrink and re-encode large images as WebP before
+                upload (requires Pillow; ignored without it)
+            response_cache_path: Optional SQLite file caching generate_json
+                responses across runs
         """
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY not found. Set environment variable or pass api_key parameter.")
 
         self.model = model
-        self.client = genai.Client(api_key=self.api_key)
+        self.downscale = downscale and Image is not None
+        # Shared SDK client: its HTTP connection pool keeps the TLS
+        # connection to the API alive between calls and across instances
+        self.client = _shared_client(self.api_key)
+        # Bounds concurrent requests to respect API rate limits
+        self._request_slots = threading.BoundedSemaphore(max_concurrent)
+        # path -> ((mtime_ns, size), image part)
+        self._image_cache: "OrderedDict[str, Tuple[Tuple[int, int], types.Part]]" = OrderedDict()
+        self._image_cache_lock = threading.Lock()
+        self.response_cache = GeminiCache(response_cache_path) if response_cache_path else None
+
+    def close(self):
+        """
+        Close the response cache.
 
-    def _load_image(self, image_path: str) -> Dict[str, Any]:
+        The pooled SDK client is shared with other instances and is closed
+        at interpreter exit instead.
+        """
+        if self.response_cache:
+            self.response_cache.close()
+            self.response_cache = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _generate_content(self, contents: List[Any], config: Dict[str, Any]):
+        """Send a generate_content request, waiting for a free request slot."""
+        with self._request_slots:
+            return self.client.models.generate_content(
+                model=self.model,
+                contents=contents,
+                config=config
+            )
+
+    def _load_image(self, image_path: str) -> types.Part:
         """
         Load image for Gemini API.
 
@@ -37,28 +199,61 @@ class GeminiClient:
             image_path: Path to image file
 
         Returns:
-            Image part dictionary for API
+            Image part holding the raw bytes (the SDK encodes them once
+            when sending)
         """
+        # The same screenshot is usually sent several times per step
+        # (assertion/final-state check, subgoal detection, retries), so the
+        # part is reused until the file changes
+        stat = os.stat(image_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._image_cache_lock:
+            cached = self._image_cache.get(image_path)
+            if cached and cached[0] == signature:
+                self._image_cache.move_to_end(image_path)
+                return cached[1]
+
         with open(image_path, 'rb') as f:
             image_data = f.read()
 
-        # Determine MIME type from extension
-        ext = Path(image_path).suffix.lower()
-        mime_types = {
-            '.png': 'image/png',
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp'
-        }
-        mime_type = mime_types.get(ext, 'image/png')
+        mime_type = _MIME_TYPES.get(os.path.splitext(image_path)[1].lower(), 'image/png')
+        if self.downscale:
+            image_data, mime_type = self._downscale_image(image_data, mime_type)
+        image_part = types.Part.from_bytes(data=image_data, mime_type=mime_type)
 
-        return {
-            'inline_data': {
-                'mime_type': mime_type,
-                'data': base64.b64encode(image_data).decode('utf-8')
-            }
-        }
+        with self._image_cache_lock:
+            self._image_cache[image_path] = (signature, image_part)
+            self._image_cache.move_to_end(image_path)
+            if len(self._image_cache) > self.IMAGE_CACHE_SIZE:
+                self._image_cache.popitem(last=False)
+
+        return image_part
+
+    def _downscale_image(self, image_data: bytes, mime_type: str) -> Tuple[bytes, str]:
+        """
+        Shrink an image to MAX_IMAGE_EDGE and re-encode it as WebP.
+
+        Args:
+            image_data: Encoded image bytes
+            mime_type: MIME type of image_data
+
+        Returns:
+            (bytes, mime_type) to upload; the input is returned unchanged if
+            it is already small enough or cannot be decoded
+        """
+        try:
+            with Image.open(io.BytesIO(image_data)) as img:
+                if max(img.size) <= self.MAX_IMAGE_EDGE:
+                    return image_data, mime_type
+                img.thumbnail((self.MAX_IMAGE_EDGE, self.MAX_IMAGE_EDGE), Image.LANCZOS)
+                if img.mode not in ('RGB', 'RGBA'):
+                    img = img.convert('RGBA')
+                buffer = io.BytesIO()
+                img.save(buffer, 'WEBP', quality=self.IMAGE_QUALITY, method=4)
+        except Exception as e:
+            logger.warning("Could not downscale image, sending original: %s", e)
+            return image_data, mime_type
+        return buffer.getvalue(), 'image/webp'
 
     def generate_text(
         self,
@@ -86,11 +281,7 @@ class GeminiClient:
 
         contents = [prompt]
 
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=contents,
-            config=config
-        )
+        response = self._generate_content(contents, config)
 
         if response.text is None:
             return ""  # Return empty string instead of None
@@ -129,11 +320,7 @@ class GeminiClient:
             prompt
         ]
 
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=contents,
-            config=config
-        )
+        response = self._generate_content(contents, config)
 
         if response.text is None:
             return ""  # Return empty string instead of None
@@ -163,6 +350,18 @@ class GeminiClient:
         # Add JSON formatting instruction to prompt
         json_prompt = f"{prompt}\n\nRespond with valid JSON only, no other text."
 
+        cache_key = None
+        if self.response_cache:
+            cache_key = self._response_cache_key(
+                json_prompt, image_path, system_instruction, temperature, max_tokens
+            )
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                try:
+                    return self._parse_json_response(cached)
+                except ValueError:
+                    pass
+
         if image_path:
             response_text = self.generate_with_image(
                 json_prompt, image_path, system_instruction, temperature, max_tokens
@@ -172,6 +371,41 @@ class GeminiClient:
                 json_prompt, system_instruction, temperature, max_tokens
             )
 
+        result = self._parse_json_response(response_text)
+        if cache_key is not None:
+            self.response_cache.put(cache_key, response_text)
+        return result
+
+    def _response_cache_key(
+        self,
+        json_prompt: str,
+        image_path: Optional[str],
+        system_instruction: Optional[str],
+        temperature: float,
+        max_tokens: int
+    ) -> bytes:
+        """Digest of everything that determines a generate_json request."""
+        h = hashlib.blake2b(digest_size=16)
+        for part in (self.model, system_instruction or '',
+                     repr(temperature), str(max_tokens), json_prompt):
+            h.update(part.encode('utf-8'))
+            h.update(b'\0')
+        if image_path:
+            with open(image_path, 'rb') as f:
+                h.update(hashlib.sha256(f.read()).digest())
+        return h.digest()
+
+    @staticmethod
+    def _parse_json_response(response_text: Optional[str]) -> Dict[str, Any]:
+        """
+        Parse a JSON response, tolerating code fences and surrounding prose.
+
+        Args:
+            response_text: Raw model output
+
+        Returns:
+            Parsed JSON response as dictionary
+        """
         # Handle None or empty response
         if response_text is None or not response_text:
             raise ValueError("Gemini API returned empty response")
@@ -191,13 +425,12 @@ class GeminiClient:
 
         # Parse JSON
         try:
-            return json.loads(response_text)
+            return _loads(response_text)
         except json.JSONDecodeError as e:
             # Try to find JSON object in text
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group(0))
+            json_object = _extract_json_object(response_text)
+            if json_object:
+                return _loads(json_object)
             raise ValueError(f"Failed to parse JSON response: {e}\nResponse: {response_text}")
 
     def generate_multimodal(
@@ -234,10 +467,6 @@ class GeminiClient:
             if text:
                 contents.append(text)
 
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=contents,
-            config=config
-        )
+        response = self._generate_content(contents, config)
 
         return response.text
@@ -0,0 +1,77 @@
+"""
+Persistent cache of LLM responses for repeated evaluation runs.
+"""
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+
+class GeminiCache:
+    """SQLite-backed store of raw response text keyed by request digest."""
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit connection shared by the evaluation threads
+        self._conn = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache(k BLOB PRIMARY KEY, v BLOB) WITHOUT ROWID"
+            )
+
+    def get(self, key: bytes) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Request digest
+
+        Returns:
+            Response text, or None on a miss or unreadable entry
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT v FROM cache WHERE k = ?", (key,)).fetchone()
+            try:
+                text = zlib.decompress(row[0]).decode('utf-8') if row is not None else None
+            except (zlib.error, UnicodeDecodeError):
+                text = None
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return text
+
+    def stats(self) -> Dict[str, int]:
+        """Lookup counts since the cache was opened."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def put(self, key: bytes, response_text: str):
+        """
+        Store a response, replacing any previous entry for the key.
+
+        Args:
+            key: Request digest
+            response_text: Raw response text
+        """
+        value = zlib.compress(response_text.encode('utf-8'), 3)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO cache(k, v) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -2,13 +2,26 @@
 Main CLI for mobile QA multiagent system.
 """
 import argparse
-import hashlib
+import atexit
+import cProfile
 import json
+import logging
+import logging.handlers
+import os
+import pstats
+import queue
+import shutil
+import signal
+import subprocess
+import sys
 import time
 import yaml
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
 
+from . import _log_handler
 from .tools.adb import ADB, ADBError
 from .tools.uixml import UIXMLParser
 from .llm.gemini_client import GeminiClient
@@ -17,15 +30,79 @@ from .agents.executor import ExecutorAgent
 from .agents.supervisor import SupervisorAgent, VerdictType
 from .evaluation.subgoals import SubgoalDecomposer, RewardCalculator, SubgoalStatus
 
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader
+
+
+def _load_tests_config(path: str) -> Dict[str, Any]:
+    """
+    Load the tests file, as JSON when it has a .json extension, YAML otherwise.
+
+    Args:
+        path: Tests file path
+
+    Returns:
+        Parsed configuration
+    """
+    if Path(path).suffix.lower() == '.json':
+        data = Path(path).read_bytes()
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+    with open(path, 'r') as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+
+def _write_json(path: Path, data: Any):
+    """
+    Write an artifact as indented JSON in a single write.
+
+    Args:
+        path: Output file
+        data: JSON-serializable data
+    """
+    if orjson is not None:
+        try:
+            path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+            return
+        except TypeError:
+            # e.g. non-string keys or integers beyond 64 bits
+            pass
+    path.write_text(json.dumps(data, indent=2), encoding='utf-8')
+
 
 class MobileQARunner:
     """Main test runner orchestrating Supervisor-Planner-Executor system."""
 
+    # Onboarding/permission buttons tapped automatically, in priority order
+    POPUP_TEXTS = (
+        "Allow", "ALLOW", "While using the app", "Continue",
+        "Continue without sync", "Not now", "OK", "Got it",
+        "USE THIS FOLDER", "Grant", "Permit"
+    )
+
+    # Post-action settle: poll the UI dump until it changes, for at most
+    # SETTLE_TIMEOUT seconds
+    SETTLE_TIMEOUT = 1.0
+    SETTLE_POLL_INTERVAL = 0.1
+
+    # Seconds after which a step's post-action screenshot is no longer reused
+    # as the next step's pre-action screenshot
+    REUSE_CAPTURE_MAX_AGE = 2.0
+
     def __init__(
         self,
         device_id: str,
         model: str = "gemini-2.0-flash-exp",
-        artifacts_dir: str = "artifacts"
+        artifacts_dir: str = "artifacts",
+        response_cache: Optional[str] = None,
+        raw_screencap: bool = False,
+        subgoal_cache: Optional[str] = None
     ):
         """
         Initialize MobileQA runner.
@@ -34,21 +111,106 @@ class MobileQARunner:
             device_id: Android device serial number
             model: LLM model to use
             artifacts_dir: Directory to save artifacts
+            response_cache: Optional SQLite file for caching LLM responses
+                across runs
+            raw_screencap: PNG-encode screenshots on the host instead of the
+                device (requires Pillow)
+            subgoal_cache: Optional directory caching subgoal decompositions
+                across runs
         """
         self.device_id = device_id
         self.artifacts_dir = Path(artifacts_dir)
 
         # Initialize tools
-        self.adb = ADB(device_id=device_id)
+        self.adb = ADB(device_id=device_id, raw_screencap=raw_screencap)
         self.ui_parser = UIXMLParser(self.adb)
 
         # Initialize LLM client
-        self.llm = GeminiClient(model=model)
+        self.llm = GeminiClient(model=model, response_cache_path=response_cache)
 
         # Initialize agents
         self.planner = PlannerAgent(self.llm)
         self.executor = ExecutorAgent(self.adb, self.ui_parser)
         self.supervisor = SupervisorAgent(self.llm)
+        # Shared by every test so its in-memory cache carries across them
+        self.subgoal_decomposer = SubgoalDecomposer(self.llm, cache_dir=subgoal_cache)
+
+        # Single worker: supervisor evaluation of one step runs here while the
+        # main thread captures the next step's UI state over ADB
+        self._llm_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mobileqa-llm")
+        # Screenshots are pulled here while the main thread dumps the UI
+        # hierarchy; the two ADB round trips are independent
+        self._capture_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mobileqa-capture")
+
+    def _capture_state(self, screenshot_path: str, ui_xml_path: str):
+        """
+        Take a screenshot and dump the UI hierarchy concurrently.
+
+        Args:
+            screenshot_path: Local path for the screenshot
+            ui_xml_path: Local path for the UI XML
+        """
+        screenshot = self._capture_pool.submit(self.adb.screenshot, screenshot_path)
+        try:
+            self.ui_parser.dump_ui(ui_xml_path)
+        finally:
+            # Surface screenshot errors too, and never leave it running
+            screenshot.result()
+
+    def _capture_state_reusing(self, previous_screenshot: str, previous_summary: str,
+                               screenshot_path: str, ui_xml_path: str) -> str:
+        """
+        Capture the state right after a post-action capture, reusing its screenshot.
+
+        The UI is always dumped fresh; the screenshot is only retaken if the
+        dump shows the screen changed since the post-action capture (e.g. a
+        notification or a late transition).
+
+        Args:
+            previous_screenshot: Post-action screenshot of the last step
+            previous_summary: UI summary taken with it
+            screenshot_path: Local path for the screenshot
+            ui_xml_path: Local path for the UI XML
+
+        Returns:
+            UI summary of the fresh dump
+        """
+        self.ui_parser.dump_ui(ui_xml_path)
+        ui_summary = self.ui_parser.get_ui_summary(ui_xml_path)
+        if ui_summary != previous_summary or not os.path.exists(previous_screenshot):
+            self.adb.screenshot(screenshot_path)
+            return ui_summary
+        try:
+            os.link(previous_screenshot, screenshot_path)
+        except OSError:
+            # Target exists, or the filesystem has no hard links
+            shutil.copyfile(previous_screenshot, screenshot_path)
+        return ui_summary
+
+    def _wait_ui_settled(self, previous_summary: str, ui_xml_path: str, timeout: Optional[float] = None) -> str:
+        """
+        Dump the UI until it differs from a previous state, or until timeout.
+
+        uiautomator dump itself waits for the UI to go idle, so the first
+        dump that differs is taken after the reaction to the action has
+        settled. Replaces a fixed sleep that was paid in full even when the
+        screen changed immediately.
+
+        Args:
+            previous_summary: UI summary from before the action
+            ui_xml_path: Path the dumps are written to (holds the last one)
+            timeout: Seconds to keep polling (default SETTLE_TIMEOUT)
+
+        Returns:
+            UI summary of the last dump
+        """
+        deadline = time.monotonic() + (self.SETTLE_TIMEOUT if timeout is None else timeout)
+        while True:
+            self.ui_parser.dump_ui(ui_xml_path)
+            summary = self.ui_parser.get_ui_summary(ui_xml_path)
+            if summary != previous_summary or time.monotonic() >= deadline:
+                return summary
+            time.sleep(self.SETTLE_POLL_INTERVAL)
 
     def handle_common_popups(self, ui_xml_path: str, step_dir: Path, max_attempts: int = 5) -> bool:
         """
@@ -60,28 +222,25 @@ class MobileQARunner:
             max_attempts: Maximum popup handling attempts
 
         Returns:
-            True if any popup was handled
+            True if any popup was handled; ui_xml_path then holds a fresh dump
+            of the settled UI
         """
-        popup_texts = [
-            "Allow", "ALLOW", "While using the app", "Continue",
-            "Continue without sync", "Not now", "OK", "Got it",
-            "USE THIS FOLDER", "Grant", "Permit"
-        ]
-
         handled_any = False
         tapped_locations = set()  # Track tapped locations to avoid infinite loops
 
         for attempt in range(max_attempts):
             # Parse current UI
             nodes = self.ui_parser.parse_xml(ui_xml_path)
+            pre_tap_summary = self.ui_parser.get_ui_summary(ui_xml_path)
 
-            # Look for popup texts
+            # Look for popup texts (one scan of the nodes for all of them)
             found_popup = False
-            for popup_text in popup_texts:
-                matches = self.ui_parser.find_by_text(nodes, popup_text, exact=False)
-                if matches:
+            popup_matches = self.ui_parser.find_first_by_texts(nodes, self.POPUP_TEXTS)
+            for popup_text in self.POPUP_TEXTS:
+                match = popup_matches.get(popup_text)
+                if match:
                     # Get center of first match
-                    x, y = matches[0].center
+                    x, y = match.center
                     location_key = f"{popup_text}_{x}_{y}"
 
                     # Skip if we already tapped this exact location
@@ -100,9 +259,8 @@ class MobileQARunner:
                 # No more popups found
                 break
 
-            # Wait and refresh UI dump for next iteration
-            time.sleep(0.2)  # SUPER FAST
-            self.ui_parser.dump_ui(ui_xml_path)
+            # Refresh UI dump for next iteration once the tap took effect
+            self._wait_ui_settled(pre_tap_summary, ui_xml_path, timeout=0.5)
 
         # Save artifact note if we handled popups
         if handled_any:
@@ -115,6 +273,47 @@ class MobileQARunner:
 
         return handled_any
 
+    def _collect_verdict(self, pending_evaluation: Tuple[Future, Path], step_rewards: list):
+        """
+        Wait for a background step evaluation and record its verdict.
+
+        Args:
+            pending_evaluation: (future returning TestVerdict, step artifacts directory)
+            step_rewards: List collecting step rewards for the test
+
+        Returns:
+            TestVerdict of the evaluated step
+        """
+        future, step_dir = pending_evaluation
+        verdict = future.result()
+
+        # NEW: Collect step reward
+        if verdict.step_reward:
+            step_rewards.append(verdict.step_reward)
+            print(f"Step reward: {verdict.step_reward.step_penalty + verdict.step_reward.subgoal_reward:.3f} "
+                  f"(cumulative: {verdict.step_reward.cumulative_reward:.3f})")
+
+        # Save verdict with subgoal and reward info
+        verdict_data = {
+            'verdict': verdict.verdict.value,
+            'reason': verdict.reason,
+            'step_number': verdict.step_number,
+            'details': verdict.details,
+            'subgoals_achieved': verdict.subgoals_achieved_this_step,
+        }
+        if verdict.step_reward:
+            verdict_data['step_reward'] = {
+                'step_penalty': verdict.step_reward.step_penalty,
+                'subgoal_reward': verdict.step_reward.subgoal_reward,
+                'cumulative_reward': verdict.step_reward.cumulative_reward,
+                'subgoals_achieved_count': verdict.step_reward.total_subgoals_achieved,
+                'total_subgoals': verdict.step_reward.total_subgoals
+            }
+        _write_json(step_dir / "verdict.json", verdict_data)
+
+        print(f"Verdict: {verdict.verdict.value} - {verdict.reason}")
+        return verdict
+
     def setup_app(self, apk_path: str, package_name: str, clear_data: bool = True):
         """
         Setup app for testing.
@@ -162,6 +361,10 @@ class MobileQARunner:
         print(f"Goal: {test_goal}")
         print(f"{'='*60}\n")
 
+        # Response cache counters at test start, for this test's hit/miss counts
+        response_cache = getattr(self.llm, 'response_cache', None)
+        cache_stats_start = response_cache.stats() if response_cache else None
+
         # Create test artifacts directory
         test_artifacts_dir = self.artifacts_dir / test_name
         test_artifacts_dir.mkdir(parents=True, exist_ok=True)
@@ -185,32 +388,29 @@ class MobileQARunner:
         initial_screenshot = str(test_artifacts_dir / "initial_screenshot.png")
         initial_ui_xml = str(test_artifacts_dir / "initial_ui.xml")
 
-        self.adb.screenshot(initial_screenshot)
-        self.ui_parser.dump_ui(initial_ui_xml)
+        self._capture_state(initial_screenshot, initial_ui_xml)
         initial_ui_summary = self.ui_parser.get_ui_summary(initial_ui_xml)
 
         # Decompose into subgoals
-        decomposer = SubgoalDecomposer(self.llm)
-        subgoal_decomposition = decomposer.decompose_test_goal(
+        subgoal_decomposition = self.subgoal_decomposer.decompose_test_goal(
             test_goal=test_goal,
             screenshot_path=initial_screenshot,
             ui_xml_summary=initial_ui_summary
         )
 
         # Save subgoal decomposition
-        with open(test_artifacts_dir / "subgoals.json", 'w') as f:
-            json.dump({
-                'test_goal': test_goal,
-                'subgoals': [
-                    {
-                        'id': sg.id,
-                        'description': sg.description,
-                        'detection_criteria': sg.detection_criteria,
-                        'status': sg.status.value
-                    }
-                    for sg in subgoal_decomposition.subgoals
-                ]
-            }, f, indent=2)
+        _write_json(test_artifacts_dir / "subgoals.json", {
+            'test_goal': test_goal,
+            'subgoals': [
+                {
+                    'id': sg.id,
+                    'description': sg.description,
+                    'detection_criteria': sg.detection_criteria,
+                    'status': sg.status.value
+                }
+                for sg in subgoal_decomposition.subgoals
+            ]
+        })
 
         print(f"Identified {len(subgoal_decomposition.subgoals)} subgoals:")
         for sg in subgoal_decomposition.subgoals:
@@ -221,18 +421,34 @@ class MobileQARunner:
             total_subgoals=len(subgoal_decomposition.subgoals)
         )
 
-        # Update supervisor with subgoal decomposition and reward calculator
-        self.supervisor.subgoal_decomposition = subgoal_decomposition
-        self.supervisor.reward_calculator = reward_calculator
+        # Let any evaluation left over from a previous test that raised finish
+        # before the supervisor state is replaced
+        self._llm_pool.submit(lambda: None).result()
+
+        # Give the supervisor this test's subgoals and reward calculator
+        self.supervisor.start_test(subgoal_decomposition, reward_calculator)
 
         # Run test steps
         step_number = 0
         previous_actions = []
         final_verdict = None
         step_rewards = []  # NEW: Track step rewards
+        step_timings = []  # Wall time per step phase, in ns
+
+        # Supervisor evaluation of the last step, still running on the LLM pool,
+        # and whether its verdict could end the test
+        pending_evaluation: Optional[Tuple[Future, Path]] = None
+        pending_ends_test = False
+
+        # Last step's post-action capture (screenshot path, UI summary,
+        # monotonic time), reused by the next pre-action capture
+        last_post_capture: Optional[Tuple[str, str, float]] = None
 
         # State tracking for loop detection
-        ui_state_hashes = []
+        ui_state_hashes = deque(maxlen=3)
+        # UI dump taken by the last recovery attempt (path, summary), reused
+        # as the next step's dump
+        recovered_dump: Optional[Tuple[str, str]] = None
         unchanged_count = 0
         recovery_attempt = 0
 
@@ -248,35 +464,63 @@ class MobileQARunner:
             screenshot_path = str(step_dir / "screenshot.png")
             ui_xml_path = str(step_dir / "ui.xml")
 
-            print("Capturing screenshot...")
-            self.adb.screenshot(screenshot_path)
-
-            print("Dumping UI hierarchy...")
-            self.ui_parser.dump_ui(ui_xml_path)
-            ui_summary = self.ui_parser.get_ui_summary(ui_xml_path)
+            timings = {'step': step_number}
+            step_timings.append(timings)
+            started = time.perf_counter_ns()
+            print("Capturing screenshot and UI hierarchy...")
+            if recovered_dump is not None:
+                shutil.copyfile(recovered_dump[0], ui_xml_path)
+                ui_summary = recovered_dump[1]
+                self.adb.screenshot(screenshot_path)
+            elif (last_post_capture is not None
+                    and time.monotonic() - last_post_capture[2] <= self.REUSE_CAPTURE_MAX_AGE):
+                ui_summary = self._capture_state_reusing(
+                    last_post_capture[0], last_post_capture[1], screenshot_path, ui_xml_path
+                )
+            else:
+                self._capture_state(screenshot_path, ui_xml_path)
+                ui_summary = self.ui_parser.get_ui_summary(ui_xml_path)
+            last_post_capture = None
+            recovered_dump = None
+            timings['capture_ns'] = time.perf_counter_ns() - started
 
             # Save UI summary
             with open(step_dir / "ui_summary.txt", 'w') as f:
                 f.write(ui_summary)
 
+            # Collect the previous step's verdict before touching the device
+            # if it could end the test; then this capture was speculative, so
+            # drop it. A verdict that must be RUNNING is collected after
+            # planning, so the planner call overlaps the evaluation.
+            if pending_evaluation is not None and pending_ends_test:
+                started = time.perf_counter_ns()
+                verdict = self._collect_verdict(pending_evaluation, step_rewards)
+                timings['verdict_wait_ns'] = time.perf_counter_ns() - started
+                pending_evaluation = None
+                if verdict.verdict is not VerdictType.RUNNING:
+                    final_verdict = verdict
+                    shutil.rmtree(step_dir, ignore_errors=True)
+                    step_timings.pop()
+                    step_number -= 1
+                    break
+
             # Handle common popups before planning
             print("Checking for common popups...")
             handled_popup = self.handle_common_popups(ui_xml_path, step_dir)
             if handled_popup:
-                # Refresh UI after handling popups
-                self.ui_parser.dump_ui(ui_xml_path)
+                # handle_common_popups leaves a fresh, settled dump in ui_xml_path
                 ui_summary = self.ui_parser.get_ui_summary(ui_xml_path)
                 with open(step_dir / "ui_summary.txt", 'w') as f:
                     f.write(ui_summary)
 
-            # Compute UI state hash for loop detection
-            ui_hash = hashlib.md5(ui_summary.encode()).hexdigest()
+            # Compute UI state hash for loop detection (only compared within
+            # this run, so the builtin str hash is enough)
+            ui_hash = hash(ui_summary)
             ui_state_hashes.append(ui_hash)
 
             # Check for unchanged UI (loop detection)
-            if len(ui_state_hashes) >= 3:
-                last_three = ui_state_hashes[-3:]
-                if len(set(last_three)) == 1:  # All same
+            if len(ui_state_hashes) == 3:
+                if ui_state_hashes[0] == ui_state_hashes[1] == ui_state_hashes[2]:
                     unchanged_count += 1
                     print(f"WARNING: UI unchanged for {unchanged_count} consecutive checks")
 
@@ -293,13 +537,14 @@ class MobileQARunner:
                             self.adb.keyevent(4, wait_after=1.5)
                         elif recovery_attempt >= 3:
                             print("Recovery: HOME and relaunch...")
-                            self.adb.keyevent(3, wait_after=1.0)
-                            self.adb.start_activity(package_name, wait_after=2.0)
+                            with self.adb.batch():
+                                self.adb.keyevent(3, wait_after=1.0)
+                                self.adb.start_activity(package_name, wait_after=2.0)
 
                             # Check if still stuck after relaunch
                             self.ui_parser.dump_ui(ui_xml_path)
                             new_ui_summary = self.ui_parser.get_ui_summary(ui_xml_path)
-                            new_hash = hashlib.md5(new_ui_summary.encode()).hexdigest()
+                            new_hash = hash(new_ui_summary)
 
                             if new_hash == ui_hash:
                                 # Still stuck after all recovery attempts
@@ -311,24 +556,41 @@ class MobileQARunner:
                                     details="UI state did not change for 3+ steps despite recovery"
                                 )
                                 break
+                            # The relaunched screen is the next step's state
+                            recovered_dump = (ui_xml_path, new_ui_summary)
 
                         # Reset UI state tracking after recovery
-                        ui_state_hashes = []
+                        ui_state_hashes.clear()
                         unchanged_count = 0
                         continue
                 else:
                     unchanged_count = 0
                     recovery_attempt = 0
 
+            # Compact, indexed view of the screen for the planner; the executor
+            # resolves the planned action against these same nodes
+            ui_nodes = self.ui_parser.parse_xml(ui_xml_path)
+            planner_ui_summary = self.ui_parser.compact_summary(ui_nodes)
+            with open(step_dir / "ui_compact.txt", 'w') as f:
+                f.write(planner_ui_summary)
+
             # Plan next action
             print("Planning next action...")
+            started = time.perf_counter_ns()
             action = self.planner.plan_next_action(
                 test_goal=test_goal,
                 current_step=step_number,
                 screenshot_path=screenshot_path,
-                ui_xml_summary=ui_summary,
+                ui_xml_summary=planner_ui_summary,
                 previous_actions=previous_actions
             )
+            timings['plan_ns'] = time.perf_counter_ns() - started
+
+            if pending_evaluation is not None:
+                started = time.perf_counter_ns()
+                self._collect_verdict(pending_evaluation, step_rewards)
+                timings['verdict_wait_ns'] = time.perf_counter_ns() - started
+                pending_evaluation = None
 
             # Validate action schema
             is_valid, validation_error = self.planner.validate_action_schema(action)
@@ -353,7 +615,7 @@ class MobileQARunner:
                 replan_prompt_addition = f"\n\nYour last action was INVALID: {validation_error}\nYou MUST output valid JSON with correct action_type and params. Review the schema carefully."
 
                 # Create a modified ui_summary with error message
-                replan_ui_summary = ui_summary + replan_prompt_addition
+                replan_ui_summary = planner_ui_summary + replan_prompt_addition
 
                 action = self.planner.plan_next_action(
                     test_goal=test_goal,
@@ -384,81 +646,65 @@ class MobileQARunner:
                     break
 
             # Save action
-            with open(step_dir / "action.json", 'w') as f:
-                json.dump(action, f, indent=2)
+            _write_json(step_dir / "action.json", action)
 
             print(f"Action: {action['action_type']} - {action['description']}")
 
             # Execute action
             print("Executing action...")
+            self.executor.set_ui_snapshot(ui_nodes)
+            started = time.perf_counter_ns()
             exec_result = self.executor.execute_action(action)
+            timings['execute_ns'] = time.perf_counter_ns() - started
             print(f"Execution: {exec_result.message}")
 
             # Save execution result
-            with open(step_dir / "execution_result.json", 'w') as f:
-                json.dump({
-                    'success': exec_result.success,
-                    'message': exec_result.message,
-                    'error': exec_result.error
-                }, f, indent=2)
+            _write_json(step_dir / "execution_result.json", {
+                'success': exec_result.success,
+                'message': exec_result.message,
+                'error': exec_result.error
+            })
 
             # Update previous actions
             previous_actions.append(action)
 
-            # Wait for UI to settle after action
-            if exec_result.success and action['action_type'] not in ['wait', 'done']:
-                time.sleep(1)
-
             # Capture post-action state
             post_screenshot_path = str(step_dir / "screenshot_post.png")
             post_ui_xml_path = str(step_dir / "ui_post.xml")
 
-            self.adb.screenshot(post_screenshot_path)
-            self.ui_parser.dump_ui(post_ui_xml_path)
-            post_ui_summary = self.ui_parser.get_ui_summary(post_ui_xml_path)
-
-            # Supervise and get verdict
+            started = time.perf_counter_ns()
+            if exec_result.success and action['action_type'] not in ['wait', 'done']:
+                # Wait for the UI to react, then screenshot the settled screen
+                post_ui_summary = self._wait_ui_settled(ui_summary, post_ui_xml_path)
+                self.adb.screenshot(post_screenshot_path)
+            else:
+                self._capture_state(post_screenshot_path, post_ui_xml_path)
+                post_ui_summary = self.ui_parser.get_ui_summary(post_ui_xml_path)
+            last_post_capture = (post_screenshot_path, post_ui_summary, time.monotonic())
+            timings['post_capture_ns'] = time.perf_counter_ns() - started
+
+            # Supervise in the background; the verdict is collected during the
+            # next step (or below, once the loop ends)
             print("Evaluating step...")
-            verdict = self.supervisor.evaluate_step(
-                test_goal=test_goal,
-                step_number=step_number,
-                action=action,
-                execution_result=exec_result,
-                screenshot_path=post_screenshot_path,
-                ui_xml_summary=post_ui_summary
+            pending_ends_test = self.supervisor.ends_test(step_number, action, exec_result)
+            pending_evaluation = (
+                self._llm_pool.submit(
+                    self.supervisor.evaluate_step,
+                    test_goal=test_goal,
+                    step_number=step_number,
+                    action=action,
+                    execution_result=exec_result,
+                    screenshot_path=post_screenshot_path,
+                    ui_xml_summary=post_ui_summary
+                ),
+                step_dir
             )
 
-            # NEW: Collect step reward
-            if verdict.step_reward:
-                step_rewards.append(verdict.step_reward)
-                print(f"Step reward: {verdict.step_reward.step_penalty + verdict.step_reward.subgoal_reward:.3f} "
-                      f"(cumulative: {verdict.step_reward.cumulative_reward:.3f})")
-
-            # Save verdict with subgoal and reward info
-            with open(step_dir / "verdict.json", 'w') as f:
-                verdict_data = {
-                    'verdict': verdict.verdict.value,
-                    'reason': verdict.reason,
-                    'step_number': verdict.step_number,
-                    'details': verdict.details,
-                    'subgoals_achieved': verdict.subgoals_achieved_this_step,
-                }
-                if verdict.step_reward:
-                    verdict_data['step_reward'] = {
-                        'step_penalty': verdict.step_reward.step_penalty,
-                        'subgoal_reward': verdict.step_reward.subgoal_reward,
-                        'cumulative_reward': verdict.step_reward.cumulative_reward,
-                        'subgoals_achieved_count': verdict.step_reward.total_subgoals_achieved,
-                        'total_subgoals': verdict.step_reward.total_subgoals
-                    }
-                json.dump(verdict_data, f, indent=2)
-
-            print(f"Verdict: {verdict.verdict.value} - {verdict.reason}")
-
-            # Check if test is complete
-            if verdict.verdict != VerdictType.RUNNING:
+        # Collect the last step's verdict if the loop ran out of steps
+        if pending_evaluation is not None:
+            verdict = self._collect_verdict(pending_evaluation, step_rewards)
+            if verdict.verdict is not VerdictType.RUNNING:
                 final_verdict = verdict
-                break
 
         # Handle case where max steps reached without verdict
         if final_verdict is None:
@@ -474,7 +720,7 @@ class MobileQARunner:
         print(f"\n{self.supervisor.format_verdict(final_verdict)}")
 
         # NEW: Calculate final reward
-        test_passed = (final_verdict.verdict == VerdictType.PASS)
+        test_passed = (final_verdict.verdict is VerdictType.PASS)
         reward_summary = reward_calculator.calculate_final_reward(
             total_steps=step_number,
             test_passed=test_passed,
@@ -482,42 +728,48 @@ class MobileQARunner:
         )
 
         # Save final subgoal status
-        with open(test_artifacts_dir / "subgoals_final.json", 'w') as f:
-            json.dump({
-                'test_goal': test_goal,
-                'subgoals': [
-                    {
-                        'id': sg.id,
-                        'description': sg.description,
-                        'status': sg.status.value,
-                        'achieved_at_step': sg.achieved_at_step,
-                        'confidence': sg.confidence
-                    }
-                    for sg in subgoal_decomposition.subgoals
-                ]
-            }, f, indent=2)
+        _write_json(test_artifacts_dir / "subgoals_final.json", {
+            'test_goal': test_goal,
+            'subgoals': [
+                {
+                    'id': sg.id,
+                    'description': sg.description,
+                    'status': sg.status.value,
+                    'achieved_at_step': sg.achieved_at_step,
+                    'confidence': sg.confidence
+                }
+                for sg in subgoal_decomposition.subgoals
+            ]
+        })
+
+        reward_data = {
+            'total_steps': reward_summary.total_steps,
+            'total_step_penalty': reward_summary.total_step_penalty,
+            'total_subgoal_reward': reward_summary.total_subgoal_reward,
+            'completion_bonus': reward_summary.completion_bonus,
+            'final_reward': reward_summary.final_reward,
+            'subgoals_achieved': reward_summary.subgoals_achieved,
+            'total_subgoals': reward_summary.total_subgoals,
+            'subgoal_completion_rate': reward_summary.subgoal_completion_rate,
+            'step_rewards': [
+                {
+                    'step': sr.step_number,
+                    'penalty': sr.step_penalty,
+                    'reward': sr.subgoal_reward,
+                    'cumulative': sr.cumulative_reward
+                }
+                for sr in reward_summary.step_rewards
+            ],
+            'step_timings': step_timings
+        }
+        if response_cache:
+            cache_stats = response_cache.stats()
+            reward_data['llm_cache'] = {
+                name: count - cache_stats_start[name] for name, count in cache_stats.items()
+            }
 
         # Save reward summary
-        with open(test_artifacts_dir / "reward_summary.json", 'w') as f:
-            json.dump({
-                'total_steps': reward_summary.total_steps,
-                'total_step_penalty': reward_summary.total_step_penalty,
-                'total_subgoal_reward': reward_summary.total_subgoal_reward,
-                'completion_bonus': reward_summary.completion_bonus,
-                'final_reward': reward_summary.final_reward,
-                'subgoals_achieved': reward_summary.subgoals_achieved,
-                'total_subgoals': reward_summary.total_subgoals,
-                'subgoal_completion_rate': reward_summary.subgoal_completion_rate,
-                'step_rewards': [
-                    {
-                        'step': sr.step_number,
-                        'penalty': sr.step_penalty,
-                        'reward': sr.subgoal_reward,
-                        'cumulative': sr.cumulative_reward
-                    }
-                    for sr in reward_summary.step_rewards
-                ]
-            }, f, indent=2)
+        _write_json(test_artifacts_dir / "reward_summary.json", reward_data)
 
         # Print reward summary
         print(f"\n{'='*60}")
@@ -551,11 +803,17 @@ class MobileQARunner:
             }
         }
 
-        with open(test_artifacts_dir / "test_result.json", 'w') as f:
-            json.dump(result, f, indent=2)
+        _write_json(test_artifacts_dir / "test_result.json", result)
 
         return result
 
+    def close(self):
+        """Wait for pending LLM and capture work, then close the LLM and ADB sessions."""
+        self._llm_pool.shutdown(wait=True)
+        self._capture_pool.shutdown(wait=True)
+        self.llm.close()
+        self.adb.close()
+
     def run_tests(self, tests_config: List[Dict[str, Any]], reset_app: bool = False) -> List[Dict[str, Any]]:
         """
         Run multiple tests.
@@ -586,6 +844,132 @@ class MobileQARunner:
         return results
 
 
+def run_tests_on_devices(
+    device_ids: List[str],
+    tests_config: List[Dict[str, Any]],
+    reset_app: bool = False,
+    **runner_kwargs
+) -> List[Dict[str, Any]]:
+    """
+    Run tests spread across several devices, one runner per device.
+
+    Each device's worker thread pulls the next pending test from a shared
+    queue, so faster devices simply run more tests.
+
+    Args:
+        device_ids: Android device serial numbers
+        tests_config: List of test configurations
+        reset_app: Whether to clear app data before each test
+        **runner_kwargs: Passed to every MobileQARunner (model, artifacts_dir, ...)
+
+    Returns:
+        List of test results, in tests_config order
+    """
+    pending: "queue.SimpleQueue[Tuple[int, Dict[str, Any]]]" = queue.SimpleQueue()
+    for index, test_config in enumerate(tests_config):
+        pending.put((index, test_config))
+    results: List[Optional[Dict[str, Any]]] = [None] * len(tests_config)
+
+    def work(runner: MobileQARunner):
+        while True:
+            try:
+                index, test_config = pending.get_nowait()
+            except queue.Empty:
+                return
+            results[index] = runner.run_tests([test_config], reset_app=reset_app)[0]
+
+    runners: List[MobileQARunner] = []
+    try:
+        with ThreadPoolExecutor(max_workers=len(device_ids), thread_name_prefix="mobileqa-device") as pool:
+            # Set up every device's runner (ADB checks, LLM client) at once
+            init_futures = [
+                pool.submit(MobileQARunner, device_id=device_id, **runner_kwargs)
+                for device_id in device_ids
+            ]
+            for future in init_futures:
+                if future.exception() is None:
+                    runners.append(future.result())
+            # Raise the first setup error once the working runners are tracked
+            for future in init_futures:
+                future.result()
+
+            for future in [pool.submit(work, runner) for runner in runners]:
+                future.result()
+    finally:
+        for runner in runners:
+            runner.close()
+    return results
+
+
+def _setup_logging() -> None:
+    """
+    Print mobileqa log records (e.g. subgoal progress) from a background thread.
+
+    Agents log through a QueueHandler so the package's default stdout
+    handler runs on the listener thread instead of inside the step loop.
+    """
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, _log_handler)
+
+    package_logger = logging.getLogger("mobileqa")
+    package_logger.setLevel(logging.INFO)
+    package_logger.removeHandler(_log_handler)
+    package_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    package_logger.propagate = False
+
+    listener.start()
+    atexit.register(listener.stop)
+
+
+def _run_profiled(mode: str, artifacts_dir: str, run: Callable[[], Any]) -> Any:
+    """
+    Run a callable under the selected profiler.
+
+    Args:
+        mode: 'cprofile', 'pyspy' or 'none'
+        artifacts_dir: Directory receiving profile.prof or flame.svg
+        run: Callable running the tests
+
+    Returns:
+        Whatever run returns
+    """
+    if mode == 'none':
+        return run()
+
+    output_dir = Path(artifacts_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(run)
+        finally:
+            profile_path = output_dir / "profile.prof"
+            profiler.dump_stats(str(profile_path))
+            print(f"\nProfile saved to {profile_path}; top functions by own time:")
+            pstats.Stats(profiler).sort_stats('tottime').print_stats(20)
+
+    # py-spy samples this process from outside, so it also sees threads
+    flame_path = output_dir / "flame.svg"
+    try:
+        sampler = subprocess.Popen(
+            ['py-spy', 'record', '-o', str(flame_path), '--pid', str(os.getpid())]
+        )
+    except OSError as e:
+        print(f"WARNING: Could not start py-spy ({e}), running without profiling")
+        return run()
+    try:
+        return run()
+    finally:
+        # SIGINT makes py-spy stop recording and write the flame graph
+        sampler.send_signal(signal.SIGINT)
+        try:
+            sampler.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            sampler.kill()
+        print(f"\nFlame graph saved to {flame_path}")
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(
@@ -594,7 +978,8 @@ def main():
     parser.add_argument(
         '--device',
         default='emulator-5554',
-        help='Android device ID (default: emulator-5554)'
+        help='Android device ID, or comma-separated IDs to spread tests across '
+             'devices (default: emulator-5554)'
     )
     parser.add_argument(
         '--avd',
@@ -607,7 +992,7 @@ def main():
     parser.add_argument(
         '--tests',
         required=True,
-        help='Path to tests YAML file'
+        help='Path to tests YAML or JSON file'
     )
     parser.add_argument(
         '--model',
@@ -619,6 +1004,21 @@ def main():
         default='artifacts',
         help='Artifacts directory (default: artifacts)'
     )
+    parser.add_argument(
+        '--response-cache',
+        help='SQLite file caching LLM responses across runs (optional)'
+    )
+    parser.add_argument(
+        '--subgoal-cache',
+        metavar='DIR',
+        help='Directory caching subgoal decompositions across runs (optional)'
+    )
+    parser.add_argument(
+        '--raw-screencap',
+        action='store_true',
+        help='Pull raw framebuffers and PNG-encode them on the host (needs Pillow; '
+             'helps slow emulators)'
+    )
     parser.add_argument(
         '--reset-app',
         action='store_true',
@@ -628,12 +1028,20 @@ def main():
         '--single-test',
         help='Run only a specific test by name'
     )
+    parser.add_argument(
+        '--profile',
+        choices=['none', 'cprofile', 'pyspy'],
+        default='none',
+        help='Profile the run with cProfile (profile.prof) or py-spy (flame.svg) '
+             'in the artifacts directory (default: none)'
+    )
 
     args = parser.parse_args()
 
+    _setup_logging()
+
     # Load test configurations
-    with open(args.tests, 'r') as f:
-        config = yaml.safe_load(f)
+    config = _load_tests_config(args.tests)
 
     tests = config.get('tests', [])
 
@@ -650,19 +1058,41 @@ def main():
         for test in tests:
             test['apk_path'] = args.apk
 
-    # Initialize runner
-    try:
-        runner = MobileQARunner(
-            device_id=args.device,
-            model=args.model,
-            artifacts_dir=args.artifacts
-        )
-    except Exception as e:
-        print(f"ERROR initializing runner: {str(e)}")
-        return 1
+    runner_kwargs = dict(
+        model=args.model,
+        artifacts_dir=args.artifacts,
+        response_cache=args.response_cache,
+        raw_screencap=args.raw_screencap,
+        subgoal_cache=args.subgoal_cache
+    )
+    device_ids = [device_id.strip() for device_id in args.device.split(',') if device_id.strip()]
+
+    if len(device_ids) > 1:
+        print(f"Running tests across {len(device_ids)} devices: {', '.join(device_ids)}")
+        try:
+            results = _run_profiled(
+                args.profile, args.artifacts,
+                lambda: run_tests_on_devices(device_ids, tests, reset_app=args.reset_app, **runner_kwargs)
+            )
+        except Exception as e:
+            print(f"ERROR initializing runner: {str(e)}")
+            return 1
+    else:
+        # Initialize runner
+        try:
+            runner = MobileQARunner(device_id=device_ids[0], **runner_kwargs)
+        except Exception as e:
+            print(f"ERROR initializing runner: {str(e)}")
+            return 1
 
-    # Run tests
-    results = runner.run_tests(tests, reset_app=args.reset_app)
+        # Run tests
+        try:
+            results = _run_profiled(
+                args.profile, args.artifacts,
+                lambda: runner.run_tests(tests, reset_app=args.reset_app)
+            )
+        finally:
+            runner.close()
 
     # Print summary
     print(f"\n{'='*60}")
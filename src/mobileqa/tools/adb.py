@@ -1,10 +1,21 @@
 """
 ADB (Android Debug Bridge) tooling for mobile device automation.
 """
+import queue
+import shlex
+import struct
 import subprocess
+import threading
 import time
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # raw screencap needs Pillow for host-side PNG encoding
+    Image = None
 
 
 class ADBError(Exception):
@@ -12,28 +23,52 @@ class ADBError(Exception):
     pass
 
 
+_ADB_NOT_FOUND = "ADB not found. Please install Android SDK Platform-Tools."
+
+
 class ADB:
     """Wrapper for ADB commands to interact with Android devices/emulators."""
 
-    def __init__(self, device_id: Optional[str] = None):
+    # screencap raw pixel formats (PixelFormat values) -> PIL raw decoder mode
+    RAW_PIXEL_MODES = {1: ('RGBA', 'RGBA'), 2: ('RGB', 'RGBX')}
+
+    # Seconds a persistent-shell command may run before the session is
+    # killed and restarted
+    SHELL_TIMEOUT = 30.0
+
+    def __init__(self, device_id: Optional[str] = None, raw_screencap: bool = False):
         """
         Initialize ADB wrapper.
 
+        Does not run adb: a missing binary surfaces as ADBError on the first
+        command (call _verify_adb() to check up front).
+
         Args:
             device_id: Device serial number (e.g., 'emulator-5554').
                       If None, uses the only connected device.
+            raw_screencap: Pull raw framebuffers and PNG-encode them on the
+                      host instead of on the device (requires Pillow)
         """
         self.device_id = device_id
-        self._verify_adb()
+        self.raw_screencap = raw_screencap and Image is not None
+        # Device shell commands deferred by batch(), or None when not batching
+        self._pending: Optional[List[str]] = None
+        # Long-lived `adb shell` session, started on first use
+        self._shell_session: Optional[subprocess.Popen] = None
+        # Session output lines, filled by a reader thread (None at EOF)
+        self._shell_lines: "queue.SimpleQueue[Optional[bytes]]" = queue.SimpleQueue()
+        self._shell_marker = f"__EOC_{uuid.uuid4().hex}__"
+        self._shell_lock = threading.Lock()
 
     def _verify_adb(self):
         """Verify ADB is installed and accessible."""
         try:
             subprocess.run(['adb', 'version'], capture_output=True, check=True)
         except (subprocess.CalledProcessError, FileNotFoundError):
-            raise ADBError("ADB not found. Please install Android SDK Platform-Tools.")
+            raise ADBError(_ADB_NOT_FOUND)
 
-    def _run_command(self, cmd: list, capture_binary: bool = False, check: bool = True) -> subprocess.CompletedProcess:
+    def _run_command(self, cmd: list, capture_binary: bool = False, check: bool = True,
+                     discard_output: bool = False) -> subprocess.CompletedProcess:
         """
         Run an ADB command.
 
@@ -41,6 +76,8 @@ class ADB:
             cmd: Command as list of strings
             capture_binary: If True, capture output as bytes
             check: If True, raise exception on non-zero exit
+            discard_output: If True, send stdout to /dev/null instead of
+                capturing and decoding it (stdout is returned empty)
 
         Returns:
             CompletedProcess result
@@ -51,6 +88,17 @@ class ADB:
         full_cmd.extend(cmd)
 
         try:
+            if discard_output:
+                # stderr is still captured for the error message
+                result = subprocess.run(
+                    full_cmd,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    check=check,
+                    text=True
+                )
+                result.stdout = ''
+                return result
             result = subprocess.run(
                 full_cmd,
                 capture_output=True,
@@ -60,6 +108,167 @@ class ADB:
             return result
         except subprocess.CalledProcessError as e:
             raise ADBError(f"ADB command failed: {' '.join(full_cmd)}\nError: {e.stderr}")
+        except FileNotFoundError:
+            raise ADBError(_ADB_NOT_FOUND)
+
+    def _shell_exec(self, command: str, timeout: Optional[float] = None) -> str:
+        """
+        Run a device shell command over the persistent shell session.
+
+        Saves spawning an adb process and its connection handshake per
+        command. Each command runs in a subshell with stdin closed, followed
+        by a marker line carrying its exit status. Callers must pass a
+        complete, quoted command line: if the marker does not arrive within
+        the timeout, the session is killed and ADBError raised.
+
+        Args:
+            command: Device shell command line
+            timeout: Seconds to wait for the command (default SHELL_TIMEOUT)
+
+        Returns:
+            Command output
+
+        Raises:
+            ADBError: If the command exits non-zero, times out, or the
+                session is lost
+        """
+        with self._shell_lock:
+            # Time spent waiting for the lock does not count against the command
+            deadline = time.monotonic() + (self.SHELL_TIMEOUT if timeout is None else timeout)
+            session = self._shell_session
+            if session is None or session.poll() is not None:
+                full_cmd = ['adb']
+                if self.device_id:
+                    full_cmd.extend(['-s', self.device_id])
+                full_cmd.append('shell')
+                try:
+                    session = subprocess.Popen(
+                        full_cmd,
+                        stdin=subprocess.PIPE,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.STDOUT,
+                        bufsize=0
+                    )
+                except FileNotFoundError:
+                    raise ADBError(_ADB_NOT_FOUND)
+                except OSError as e:
+                    raise ADBError(f"Could not start adb shell session: {e}")
+                self._shell_session = session
+                # Each session gets its own queue, so a dead session's
+                # leftover lines never reach the next one
+                self._shell_lines = queue.SimpleQueue()
+                threading.Thread(
+                    target=self._read_shell_lines,
+                    args=(session, self._shell_lines),
+                    name="adb-shell-reader",
+                    daemon=True
+                ).start()
+            lines = self._shell_lines
+
+            marker = self._shell_marker.encode()
+            line = f"( {command} ) </dev/null; printf '\\n{self._shell_marker}%d\\n' $?\n"
+            output = []
+            try:
+                session.stdin.write(line.encode('utf-8'))
+                while True:
+                    out_line = lines.get(timeout=max(deadline - time.monotonic(), 0))
+                    if out_line is None:
+                        raise EOFError
+                    if out_line.startswith(marker):
+                        status = int(out_line[len(marker):].strip() or 1)
+                        break
+                    output.append(out_line)
+            except queue.Empty:
+                self._close_shell_session(kill=True)
+                raise ADBError(f"adb shell command timed out: {command}")
+            except (OSError, EOFError, ValueError):
+                self._close_shell_session()
+                raise ADBError(f"adb shell session lost while running: {command}")
+
+        # Drop the newline printed ahead of the marker
+        text = b''.join(output).decode('utf-8', errors='replace')
+        if text.endswith('\n'):
+            text = text[:-1]
+        if status != 0:
+            raise ADBError(f"ADB command failed: adb shell {command}\nError: {text}")
+        return text
+
+    @staticmethod
+    def _read_shell_lines(session: subprocess.Popen, lines: "queue.SimpleQueue[Optional[bytes]]"):
+        """Forward a shell session's output lines to a queue until EOF."""
+        try:
+            for out_line in iter(session.stdout.readline, b''):
+                lines.put(out_line)
+        except (OSError, ValueError):
+            pass
+        lines.put(None)
+
+    def _close_shell_session(self, kill: bool = False):
+        """
+        Terminate the persistent shell session, if any.
+
+        Args:
+            kill: Kill the session instead of closing its stdin, e.g. when a
+                command is stuck
+        """
+        session, self._shell_session = self._shell_session, None
+        if session is None:
+            return
+        if kill:
+            session.kill()
+            session.wait()
+            return
+        try:
+            session.stdin.close()
+        except OSError:
+            pass
+        try:
+            session.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            session.kill()
+            session.wait()
+
+    def close(self):
+        """Close the persistent shell session."""
+        with self._shell_lock:
+            self._close_shell_session()
+
+    def _device_command(self, args: List[str]):
+        """
+        Run a device shell command, or queue it while batching.
+
+        Args:
+            args: Shell command arguments (each one shell-quoted)
+        """
+        command = shlex.join(args)
+        if self._pending is not None:
+            self._pending.append(command)
+        else:
+            self._shell_exec(command)
+
+    @contextmanager
+    def batch(self) -> Iterator["ADB"]:
+        """
+        Defer taps, swipes, key events, typing and launches issued in the block.
+
+        The deferred commands are sent in a single ADB round-trip when the
+        block exits without an exception. Calls inside the block return True
+        without checking the device.
+
+        Yields:
+            This ADB instance
+        """
+        if self._pending is not None:
+            # Nested batch: everything flushes with the outermost block
+            yield self
+            return
+        self._pending = []
+        try:
+            yield self
+            commands = self._pending
+        finally:
+            self._pending = None
+        self.shell_pipeline(commands)
 
     def install_apk(self, apk_path: str, replace: bool = True) -> bool:
         """
@@ -93,13 +302,13 @@ class ADB:
         Returns:
             List of package names
         """
-        cmd = ['shell', 'pm', 'list', 'packages']
+        cmd = ['pm', 'list', 'packages']
         if filter_text:
             cmd.append(filter_text)
 
-        result = self._run_command(cmd)
-        packages = [line.replace('package:', '').strip()
-                   for line in result.stdout.split('\n') if line.strip()]
+        output = self._shell_exec(shlex.join(cmd))
+        packages = [line.removeprefix('package:').strip()
+                   for line in output.splitlines() if line.strip()]
         return packages
 
     def wm_size(self) -> Tuple[int, int]:
@@ -109,14 +318,52 @@ class ADB:
         Returns:
             Tuple of (width, height)
         """
-        result = self._run_command(['shell', 'wm', 'size'])
+        output = self._shell_exec('wm size')
         # Output format: "Physical size: 1080x2400"
-        size_line = result.stdout.strip().split('\n')[-1]
+        size_line = output.strip().rpartition('\n')[2]
         if ':' in size_line:
             size_str = size_line.split(':')[-1].strip()
             width, height = map(int, size_str.split('x'))
             return (width, height)
-        raise ADBError(f"Could not parse screen size: {result.stdout}")
+        raise ADBError(f"Could not parse screen size: {output}")
+
+    def screenshot_bytes(self) -> bytes:
+        """
+        Take a screenshot and return it in memory.
+
+        Callers that only need the image (e.g. Image.open(io.BytesIO(...)))
+        skip the file write and read of screenshot().
+
+        Returns:
+            PNG data
+        """
+        # Use exec-out to get raw PNG data without line ending conversion
+        return self._run_command(['exec-out', 'screencap', '-p'], capture_binary=True).stdout
+
+    def screenshot_raw(self) -> Optional["Image.Image"]:
+        """
+        Take a screenshot as an uncompressed framebuffer.
+
+        Skips the PNG encode on the device, which dominates screencap time
+        on slow emulators, at the cost of a larger transfer.
+
+        Returns:
+            PIL image, or None if Pillow is missing or the output has an
+            unexpected layout or pixel format
+        """
+        if Image is None:
+            return None
+        data = self._run_command(['exec-out', 'screencap'], capture_binary=True).stdout
+        if len(data) < 12:
+            return None
+        width, height, pixel_format = struct.unpack_from('<III', data)
+        modes = self.RAW_PIXEL_MODES.get(pixel_format)
+        # 12-byte header, or 16 bytes with the color space on Android 9+
+        header_size = len(data) - width * height * 4
+        if modes is None or header_size not in (12, 16):
+            return None
+        mode, raw_mode = modes
+        return Image.frombuffer(mode, (width, height), data[header_size:], 'raw', raw_mode, 0, 1)
 
     def screenshot(self, output_path: str) -> bool:
         """
@@ -128,14 +375,19 @@ class ADB:
         Returns:
             True if successful
         """
-        # Use exec-out to get raw PNG data without line ending conversion
-        result = self._run_command(['exec-out', 'screencap', '-p'], capture_binary=True)
-
         output_file = Path(output_path)
         output_file.parent.mkdir(parents=True, exist_ok=True)
 
-        with open(output_path, 'wb') as f:
-            f.write(result.stdout)
+        image = self.screenshot_raw() if self.raw_screencap else None
+        if image is not None:
+            # Fast zlib level: the host encode replaces the device's
+            image.save(output_path, format='PNG', compress_level=1)
+        else:
+            # Unsupported raw output stays unsupported on this device
+            self.raw_screencap = False
+            png_data = self.screenshot_bytes()
+            with open(output_path, 'wb') as f:
+                f.write(png_data)
 
         return output_file.exists() and output_file.stat().st_size > 0
 
@@ -151,7 +403,7 @@ class ADB:
         Returns:
             True if successful
         """
-        self._run_command(['shell', 'input', 'tap', str(x), str(y)])
+        self._device_command(['input', 'tap', str(x), str(y)])
         return True
 
     def swipe(self, x1: int, y1: int, x2: int, y2: int, duration_ms: int = 150, wait_after: float = 0.0) -> bool:
@@ -167,8 +419,8 @@ class ADB:
         Returns:
             True if successful
         """
-        self._run_command([
-            'shell', 'input', 'swipe',
+        self._device_command([
+            'input', 'swipe',
             str(x1), str(y1), str(x2), str(y2), str(duration_ms)
         ])
         return True
@@ -185,7 +437,7 @@ class ADB:
         Returns:
             True if successful
         """
-        self._run_command(['shell', 'input', 'keyevent', str(keycode)])
+        self._device_command(['input', 'keyevent', str(keycode)])
         return True
 
     def type_text(self, text: str, wait_after: float = 0.0) -> bool:
@@ -199,9 +451,9 @@ class ADB:
         Returns:
             True if successful
         """
-        # Escape spaces and special characters for shell
+        # `input text` reads spaces as %s; _device_command shell-quotes it
         escaped_text = text.replace(' ', '%s')
-        self._run_command(['shell', 'input', 'text', escaped_text])
+        self._device_command(['input', 'text', escaped_text])
         return True
 
     def start_activity(self, package: str, activity: Optional[str] = None, wait_after: float = 0.0) -> bool:
@@ -216,16 +468,48 @@ class ADB:
         Returns:
             True if successful
         """
-        cmd = ['shell', 'am', 'start', '-n']
+        cmd = ['am', 'start', '-n']
         if activity:
             cmd.append(f"{package}/{activity}")
         else:
             # Launch default activity
-            cmd = ['shell', 'monkey', '-p', package, '-c', 'android.intent.category.LAUNCHER', '1']
+            cmd = ['monkey', '-p', package, '-c', 'android.intent.category.LAUNCHER', '1']
 
-        self._run_command(cmd)
+        self._device_command(cmd)
         return True
 
+    def shell_pipeline(self, commands: List[str], separator: str = ' && ') -> str:
+        """
+        Execute several shell commands in a single ADB round-trip.
+
+        Commands run in order inside one device shell; with the default
+        separator the chain stops at the first failing command, so a failure
+        surfaces as ADBError just like the equivalent sequence of calls.
+
+        Args:
+            commands: Device shell commands (already quoted where needed)
+            separator: Shell operator used to join the commands
+
+        Returns:
+            Combined command output
+        """
+        if not commands:
+            return ""
+        return self._shell_exec(separator.join(commands)).strip()
+
+    @staticmethod
+    def quote_text(text: str) -> str:
+        """
+        Escape text for `input text` inside a shell command string.
+
+        Args:
+            text: Text to type
+
+        Returns:
+            Shell-quoted argument with spaces encoded as %s
+        """
+        return shlex.quote(text.replace(' ', '%s'))
+
     def clear_app_data(self, package: str) -> bool:
         """
         Clear app data and cache.
@@ -236,13 +520,15 @@ class ADB:
         Returns:
             True if successful
         """
-        result = self._run_command(['shell', 'pm', 'clear', package])
-        return 'Success' in result.stdout
+        return 'Success' in self._shell_exec(shlex.join(['pm', 'clear', package]))
 
     def shell(self, command: str) -> str:
         """
         Execute arbitrary shell command.
 
+        Runs in its own `adb shell` rather than the persistent session, so
+        free-form input cannot leave the shared session waiting for more.
+
         Args:
             command: Shell command to execute
 
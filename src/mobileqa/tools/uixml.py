@@ -1,17 +1,25 @@
 """
 UI XML parsing and interaction utilities for Android UI hierarchy.
 """
+import hashlib
+import io
+import logging
 import re
 import tempfile
+import threading
 import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List, Tuple
-from dataclasses import dataclass
+from typing import Dict, Optional, List, Sequence, Tuple
+from dataclasses import dataclass, field
 
-from .adb import ADB
+from .adb import ADB, ADBError
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+
+@dataclass(slots=True)
 class UINode:
     """Represents a UI element from the XML hierarchy."""
     tag: str
@@ -32,6 +40,13 @@ class UINode:
     password: bool
     selected: bool
     bounds: Tuple[int, int, int, int]  # (left, top, right, bottom)
+    # Case-folded text and content-desc for the text searches, computed once
+    text_lower: str = field(init=False, repr=False, compare=False)
+    content_desc_lower: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.text_lower = self.text.lower()
+        self.content_desc_lower = self.content_desc.lower()
 
     @property
     def center(self) -> Tuple[int, int]:
@@ -50,9 +65,57 @@ class UINode:
         return self.bounds[3] - self.bounds[1]
 
 
+def truncate_summary(summary: str, max_chars: int = 3000) -> str:
+    """
+    Shorten a UI summary for an LLM prompt by keeping its head and tail.
+
+    Args:
+        summary: UI summary text (see UIXMLParser.get_ui_summary)
+        max_chars: Maximum length kept before truncating
+
+    Returns:
+        The summary unchanged if short enough, otherwise the first and last
+        max_chars // 2 characters around an omission marker
+    """
+    if len(summary) <= max_chars:
+        return summary
+    half = max_chars // 2
+    omitted = len(summary) - 2 * half
+    return f"{summary[:half]}\n... ({omitted} characters omitted) ...\n{summary[-half:]}"
+
+
+# Bounds attribute, "[left,top][right,bottom]"
+_BOUNDS_RE = re.compile(r'\[(\d+),(\d+)\]\[(\d+),(\d+)\]')
+
+
+@lru_cache(maxsize=4096)
+def _parse_bounds(bounds_str: str) -> Tuple[int, int, int, int]:
+    """Bounds tuple for a bounds attribute; most repeat across a test's dumps."""
+    match = _BOUNDS_RE.match(bounds_str)
+    if match:
+        return (int(match[1]), int(match[2]), int(match[3]), int(match[4]))
+    return (0, 0, 0, 0)
+
+
+@lru_cache(maxsize=32)
+def _any_text_pattern(texts: Tuple[str, ...]) -> "re.Pattern[str]":
+    """Alternation matching any of the given texts, lowercased."""
+    return re.compile("|".join(sorted({re.escape(text.lower()) for text in texts})))
+
+
 class UIXMLParser:
     """Parser for Android UI XML hierarchy."""
 
+    # Parsed hierarchies (and their summaries) kept by XML content digest
+    PARSE_CACHE_SIZE = 64
+
+    # Screen center assumed when `wm size` cannot be read (typical phone)
+    FALLBACK_SCREEN_CENTER = (540, 1000)
+
+    # Consecutive failed exec-out dumps before falling back to dump + pull
+    # for good; a single empty or truncated dump only affects that call
+    STREAM_DUMP_MAX_FAILURES = 3
+
     def __init__(self, adb: ADB):
         """
         Initialize UI XML parser.
@@ -61,6 +124,15 @@ class UIXMLParser:
             adb: ADB instance for device communication
         """
         self.adb = adb
+        # digest -> (nodes, summary or None); a step parses the same dump for
+        # popup handling, the summary and the compact planner view
+        self._parse_cache: "OrderedDict[bytes, List]" = OrderedDict()
+        self._parse_cache_lock = threading.Lock()
+        # Cleared after STREAM_DUMP_MAX_FAILURES failed exec-out dumps in a row
+        self._stream_dump = True
+        self._stream_dump_failures = 0
+        # Screen geometry is fixed for the session; read on first use
+        self._screen_size: Optional[Tuple[int, int]] = None
 
     def dump_ui(self, output_path: Optional[str] = None) -> str:
         """
@@ -73,10 +145,6 @@ class UIXMLParser:
         Returns:
             Path to the XML file
         """
-        # Dump UI hierarchy on device
-        device_xml_path = '/sdcard/window_dump.xml'
-        self.adb._run_command(['shell', 'uiautomator', 'dump', device_xml_path])
-
         # Determine output path
         if output_path is None:
             temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.xml', delete=False)
@@ -85,11 +153,66 @@ class UIXMLParser:
         else:
             Path(output_path).parent.mkdir(parents=True, exist_ok=True)
 
+        # Stream the dump to stdout: one ADB round-trip instead of dump + pull
+        if self._stream_dump:
+            xml_data = self._dump_ui_stdout()
+            if xml_data is not None:
+                self._stream_dump_failures = 0
+                with open(output_path, 'wb') as f:
+                    f.write(xml_data)
+                return output_path
+            self._stream_dump_failures += 1
+            if self._stream_dump_failures >= self.STREAM_DUMP_MAX_FAILURES:
+                self._stream_dump = False
+                logger.warning(
+                    "exec-out UI dump failed %d times in a row; using dump + pull from now on",
+                    self._stream_dump_failures
+                )
+
+        # Dump UI hierarchy on device
+        device_xml_path = '/sdcard/window_dump.xml'
+        self.adb._run_command(['shell', 'uiautomator', 'dump', device_xml_path], discard_output=True)
+
         # Pull XML file from device
-        self.adb._run_command(['pull', device_xml_path, output_path])
+        self.adb._run_command(['pull', device_xml_path, output_path], discard_output=True)
 
         return output_path
 
+    def _dump_ui_stdout(self) -> Optional[bytes]:
+        """
+        Dump the UI hierarchy through `exec-out uiautomator dump /dev/tty`.
+
+        Returns:
+            The XML document, or None if the output held no complete hierarchy
+        """
+        result = self.adb._run_command(
+            ['exec-out', 'uiautomator', 'dump', '/dev/tty'], capture_binary=True, check=False
+        )
+        data = result.stdout or b''
+        # The XML is followed by "UI hierchary dumped to: /dev/tty"
+        start = data.find(b'<?xml')
+        if start == -1:
+            start = data.find(b'<hierarchy')
+        end = data.rfind(b'</hierarchy>')
+        if start == -1 or end < start:
+            return None
+        return data[start:end + len(b'</hierarchy>')]
+
+    def screen_size(self) -> Tuple[int, int]:
+        """
+        Get the device screen size, querying `wm size` only once.
+
+        Returns:
+            Tuple of (width, height)
+        """
+        if self._screen_size is None:
+            self._screen_size = self.adb.wm_size()
+        return self._screen_size
+
+    def invalidate_screen_size(self):
+        """Forget the cached screen size (e.g. after a device rotation)."""
+        self._screen_size = None
+
     def parse_bounds(self, bounds_str: str) -> Tuple[int, int, int, int]:
         """
         Parse bounds string to coordinates.
@@ -100,11 +223,7 @@ class UIXMLParser:
         Returns:
             Tuple of (left, top, right, bottom)
         """
-        # Extract numbers from "[left,top][right,bottom]" format
-        match = re.match(r'\[(\d+),(\d+)\]\[(\d+),(\d+)\]', bounds_str)
-        if match:
-            return tuple(map(int, match.groups()))
-        return (0, 0, 0, 0)
+        return _parse_bounds(bounds_str)
 
     def parse_xml(self, xml_path: str) -> List[UINode]:
         """
@@ -116,45 +235,65 @@ class UIXMLParser:
         Returns:
             List of UINode objects
         """
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
+        _, nodes = self._parse_cached(xml_path)
+        # Callers get their own list; the nodes themselves are shared
+        return list(nodes)
+
+    def _parse_cached(self, xml_path: str) -> Tuple[bytes, List[UINode]]:
+        """Parse an XML file, reusing the result for identical content."""
+        with open(xml_path, 'rb') as f:
+            data = f.read()
+        key = hashlib.blake2b(data, digest_size=16).digest()
+        with self._parse_cache_lock:
+            entry = self._parse_cache.get(key)
+            if entry is not None:
+                self._parse_cache.move_to_end(key)
+                return key, entry[0]
+
+        nodes = self._parse_nodes(data)
+
+        with self._parse_cache_lock:
+            self._parse_cache[key] = [nodes, None]
+            if len(self._parse_cache) > self.PARSE_CACHE_SIZE:
+                self._parse_cache.popitem(last=False)
+        return key, nodes
+
+    def _parse_nodes(self, data: bytes) -> List[UINode]:
+        """
+        Parse XML content into UINode objects in document order.
 
+        Streams the elements with iterparse instead of recursing over a
+        built tree, and frees each element once its subtree is done.
+        """
         nodes = []
-        self._parse_node(root, nodes)
-        return nodes
-
-    def _parse_node(self, element: ET.Element, nodes: List[UINode]):
-        """Recursively parse XML element tree."""
-        # Parse current node
-        bounds_str = element.get('bounds', '[0,0][0,0]')
-        bounds = self.parse_bounds(bounds_str)
-
-        node = UINode(
-            tag=element.tag,
-            index=int(element.get('index', '0')),
-            text=element.get('text', ''),
-            resource_id=element.get('resource-id', ''),
-            class_name=element.get('class', ''),
-            package=element.get('package', ''),
-            content_desc=element.get('content-desc', ''),
-            checkable=element.get('checkable', 'false') == 'true',
-            checked=element.get('checked', 'false') == 'true',
-            clickable=element.get('clickable', 'false') == 'true',
-            enabled=element.get('enabled', 'true') == 'true',
-            focusable=element.get('focusable', 'false') == 'true',
-            focused=element.get('focused', 'false') == 'true',
-            scrollable=element.get('scrollable', 'false') == 'true',
-            long_clickable=element.get('long-clickable', 'false') == 'true',
-            password=element.get('password', 'false') == 'true',
-            selected=element.get('selected', 'false') == 'true',
-            bounds=bounds
-        )
-
-        nodes.append(node)
+        parse_bounds = _parse_bounds
+        for event, element in ET.iterparse(io.BytesIO(data), events=('start', 'end')):
+            if event == 'end':
+                element.clear()
+                continue
 
-        # Parse children
-        for child in element:
-            self._parse_node(child, nodes)
+            get = element.attrib.get
+            nodes.append(UINode(
+                tag=element.tag,
+                index=int(get('index', '0')),
+                text=get('text', ''),
+                resource_id=get('resource-id', ''),
+                class_name=get('class', ''),
+                package=get('package', ''),
+                content_desc=get('content-desc', ''),
+                checkable=get('checkable', 'false') == 'true',
+                checked=get('checked', 'false') == 'true',
+                clickable=get('clickable', 'false') == 'true',
+                enabled=get('enabled', 'true') == 'true',
+                focusable=get('focusable', 'false') == 'true',
+                focused=get('focused', 'false') == 'true',
+                scrollable=get('scrollable', 'false') == 'true',
+                long_clickable=get('long-clickable', 'false') == 'true',
+                password=get('password', 'false') == 'true',
+                selected=get('selected', 'false') == 'true',
+                bounds=parse_bounds(get('bounds', '[0,0][0,0]'))
+            ))
+        return nodes
 
     def find_by_text(self, nodes: List[UINode], text: str, exact: bool = False) -> List[UINode]:
         """
@@ -180,23 +319,27 @@ class UIXMLParser:
         text_lower = text.lower()
 
         for node in nodes:
-            node_text = node.text
-            node_desc = node.content_desc
-
             # Exact match (case-sensitive)
-            if node_text == text or node_desc == text:
+            if node.text == text or node.content_desc == text:
                 exact_matches.append(node)
                 continue
 
-            if not exact:
-                # Case-insensitive exact match
-                if node_text.lower() == text_lower or node_desc.lower() == text_lower:
-                    case_insensitive_matches.append(node)
-                    continue
+            # Weaker tiers are only returned if no stronger tier matched
+            if exact or exact_matches:
+                continue
+
+            node_text_lower = node.text_lower
+            node_desc_lower = node.content_desc_lower
+
+            # Case-insensitive exact match
+            if node_text_lower == text_lower or node_desc_lower == text_lower:
+                case_insensitive_matches.append(node)
+                continue
 
-                # Substring match
-                if text_lower in node_text.lower() or text_lower in node_desc.lower():
-                    substring_matches.append(node)
+            # Substring match
+            if not case_insensitive_matches and (
+                    text_lower in node_text_lower or text_lower in node_desc_lower):
+                substring_matches.append(node)
 
         # Return best matches first
         if exact_matches:
@@ -205,6 +348,51 @@ class UIXMLParser:
             return case_insensitive_matches
         return substring_matches
 
+    def find_first_by_texts(self, nodes: List[UINode], texts: Sequence[str]) -> Dict[str, UINode]:
+        """
+        Find the best match for each of several texts in one pass over the nodes.
+
+        Equivalent to taking find_by_text(nodes, text)[0] for every text,
+        but each node is only scanned once.
+
+        Args:
+            nodes: List of UINode objects to search
+            texts: Texts to search for
+
+        Returns:
+            Dict from each text that matched to its best matching node
+        """
+        texts = tuple(texts)
+        if not texts:
+            return {}
+        pattern = _any_text_pattern(texts)
+        lowered = [(text, text.lower()) for text in texts]
+        # text -> (rank, node); rank 0 exact, 1 case-insensitive, 2 substring
+        best: Dict[str, Tuple[int, UINode]] = {}
+
+        for node in nodes:
+            node_text = node.text
+            node_desc = node.content_desc
+            text_lower_node = node.text_lower
+            desc_lower_node = node.content_desc_lower
+            # Every match is at least a case-insensitive substring match
+            if not (pattern.search(text_lower_node) or pattern.search(desc_lower_node)):
+                continue
+            for text, text_lower in lowered:
+                if node_text == text or node_desc == text:
+                    rank = 0
+                elif text_lower_node == text_lower or desc_lower_node == text_lower:
+                    rank = 1
+                elif text_lower in text_lower_node or text_lower in desc_lower_node:
+                    rank = 2
+                else:
+                    continue
+                # Earlier nodes win ties, as in find_by_text
+                if text not in best or rank < best[text][0]:
+                    best[text] = (rank, node)
+
+        return {text: node for text, (_, node) in best.items()}
+
     def find_by_resource_id(self, nodes: List[UINode], resource_id: str) -> List[UINode]:
         """
         Find UI nodes by resource ID.
@@ -251,20 +439,36 @@ class UIXMLParser:
         xml_path = self.dump_ui()
         nodes = self.parse_xml(xml_path)
 
-        # Find matching nodes
-        matches = self.find_by_text(nodes, text, exact=exact)
-
-        if not matches:
+        best_match = self.find_tap_target(nodes, text, exact=exact)
+        if best_match is None:
             return False
 
-        # Choose best match if multiple
-        best_match = self._choose_best_match(matches)
-
         # Tap the best match
         x, y = best_match.center
         self.adb.tap_xy(x, y, wait_after=wait_after)
         return True
 
+    def find_tap_target(self, nodes: List[UINode], text: str, exact: bool = False) -> Optional[UINode]:
+        """
+        Find the node tap_by_text would tap, without dumping the UI.
+
+        Args:
+            nodes: List of UINode objects to search
+            text: Text to search for
+            exact: If True, match exactly; otherwise substring match
+
+        Returns:
+            Best matching node, or None if no node matches
+        """
+        # Find matching nodes
+        matches = self.find_by_text(nodes, text, exact=exact)
+
+        if not matches:
+            return None
+
+        # Choose best match if multiple
+        return self._choose_best_match(matches)
+
     def _choose_best_match(self, matches: List[UINode]) -> UINode:
         """
         Choose the best match from multiple candidates.
@@ -289,16 +493,69 @@ class UIXMLParser:
             # Choose largest clickable element
             return max(clickable, key=lambda n: n.width * n.height)
 
-        # No clickable elements, choose closest to center
-        # Assume typical phone screen center around 540x1000
-        screen_center_x = 540
-        screen_center_y = 1000
+        # No clickable elements, choose closest to the screen center
+        try:
+            width, height = self.screen_size()
+            screen_center_x, screen_center_y = width // 2, height // 2
+        except (ADBError, ValueError):
+            screen_center_x, screen_center_y = self.FALLBACK_SCREEN_CENTER
+
+        def squared_distance_to_center(node: UINode) -> int:
+            # Same order as the Euclidean distance, without the sqrt
+            left, top, right, bottom = node.bounds
+            dx = (left + right) // 2 - screen_center_x
+            dy = (top + bottom) // 2 - screen_center_y
+            return dx * dx + dy * dy
+
+        return min(matches, key=squared_distance_to_center)
+
+    def compact_summary(self, nodes: List[UINode], max_text: int = 60) -> str:
+        """
+        Get a token-efficient summary of UI elements for LLM prompts.
+
+        One line per interesting node, e.g.
+        `[12] Button "Create new note" @500,250 [clickable]`, where 12 is the
+        node's position in `nodes` and @x,y its center.
+
+        Args:
+            nodes: Parsed UI nodes (see parse_xml)
+            max_text: Maximum characters kept from text and content-desc
+
+        Returns:
+            Compact text summary of important UI elements
+        """
+        summary_lines = []
+        for i, node in enumerate(nodes):
+            if not (node.text or node.content_desc or node.clickable):
+                continue
+
+            parts = [f"[{i}]", node.class_name.rsplit('.', 1)[-1] or node.tag]
+            if node.text:
+                parts.append(f'"{node.text[:max_text]}"')
+            if node.content_desc:
+                parts.append(f'desc="{node.content_desc[:max_text]}"')
+            if not node.text and not node.content_desc and node.resource_id:
+                # Icon-only elements: the resource ID is the only hint
+                parts.append(f"id={node.resource_id.rsplit('/', 1)[-1]}")
 
-        def distance_to_center(node: UINode) -> float:
             cx, cy = node.center
-            return ((cx - screen_center_x) ** 2 + (cy - screen_center_y) ** 2) ** 0.5
+            parts.append(f"@{cx},{cy}")
 
-        return min(matches, key=distance_to_center)
+            attrs = []
+            if node.clickable:
+                attrs.append('clickable')
+            if node.scrollable:
+                attrs.append('scrollable')
+            if node.checked:
+                attrs.append('checked')
+            if not node.enabled:
+                attrs.append('disabled')
+            if attrs:
+                parts.append(f"[{','.join(attrs)}]")
+
+            summary_lines.append(' '.join(parts))
+
+        return '\n'.join(summary_lines)
 
     def get_ui_summary(self, xml_path: str) -> str:
         """
@@ -310,8 +567,21 @@ class UIXMLParser:
         Returns:
             Text summary of important UI elements
         """
-        nodes = self.parse_xml(xml_path)
-
+        key, nodes = self._parse_cached(xml_path)
+        with self._parse_cache_lock:
+            entry = self._parse_cache.get(key)
+            if entry is not None and entry[1] is not None:
+                return entry[1]
+
+        summary = self._build_ui_summary(nodes)
+        with self._parse_cache_lock:
+            entry = self._parse_cache.get(key)
+            if entry is not None:
+                entry[1] = summary
+        return summary
+
+    def _build_ui_summary(self, nodes: List[UINode]) -> str:
+        """Format the interesting nodes of a parsed hierarchy, one per line."""
         # Filter to interesting elements (have text, content-desc, or are clickable)
         interesting = [
             node for node in nodes
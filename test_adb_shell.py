@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent ADB shell session.
+
+Runs the ADB wrapper against a stand-in `adb` executable that hands the
+session to the local /bin/sh, so marker parsing, exit statuses, argument
+quoting, batching and timeouts can be checked without a device.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+# `adb [-s SERIAL] shell [CMD]` runs sh locally; `input` logs its arguments
+FAKE_ADB = """#!/bin/sh
+[ "$1" = "-s" ] && shift 2
+if [ "$1" = "shell" ]; then
+    shift
+    if [ $# -eq 0 ]; then exec sh; else exec sh -c "$*"; fi
+fi
+echo "adb $*"
+"""
+
+FAKE_INPUT = """#!/bin/sh
+for arg in "$@"; do printf '[%s]' "$arg" >> "$INPUT_LOG"; done
+echo >> "$INPUT_LOG"
+"""
+
+
+def _install_fake_adb(bin_dir: Path) -> Path:
+    """Put the fake adb and input commands first on PATH; return the input log."""
+    for name, script in (("adb", FAKE_ADB), ("input", FAKE_INPUT)):
+        path = bin_dir / name
+        path.write_text(script)
+        path.chmod(0o755)
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
+    input_log = bin_dir / "input.log"
+    os.environ["INPUT_LOG"] = str(input_log)
+    return input_log
+
+
+def _read_log(input_log: Path) -> list:
+    lines = input_log.read_text().splitlines() if input_log.exists() else []
+    input_log.unlink(missing_ok=True)
+    return lines
+
+
+def test_shell_output():
+    """Test that command output is returned as printed, without the end-of-command marker."""
+    print("\nTesting shell output parsing...")
+    try:
+        from mobileqa.tools.adb import ADB, ADBError
+
+        adb = ADB(device_id="emulator-5554")
+        try:
+            assert adb._shell_exec("echo hello") == "hello\n"
+            print("  ✓ Single-line output parsed")
+
+            assert adb._shell_exec("printf 'a\\nb\\n'") == "a\nb\n"
+            assert adb._shell_exec("printf 'no newline'") == "no newline"
+            assert adb._shell_exec("true") == ""
+            print("  ✓ Output returned exactly as printed")
+
+            session = adb._shell_session
+            try:
+                adb._shell_exec("echo oops; exit 3")
+                raise AssertionError("non-zero exit did not raise")
+            except ADBError as e:
+                assert "oops" in str(e)
+            assert adb._shell_exec("echo again") == "again\n"
+            assert adb._shell_session is session
+            print("  ✓ Non-zero exit raises ADBError and keeps the session")
+
+            # A stray `cat` must not swallow the next command
+            assert adb._shell_exec("cat; echo after") == "after\n"
+            print("  ✓ Commands run with stdin closed")
+        finally:
+            adb.close()
+
+        return True
+    except Exception as e:
+        print(f"  ✗ Shell output test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_argument_quoting(input_log: Path):
+    """Test that device commands reach the device shell argument by argument."""
+    print("\nTesting argument quoting...")
+    try:
+        from mobileqa.tools.adb import ADB
+
+        adb = ADB()
+        try:
+            adb.type_text("it's (a) \"test\"; rm -rf x")
+            assert _read_log(input_log) == ["[text][it's%s(a)%s\"test\";%srm%s-rf%sx]"]
+            print("  ✓ type_text passes quotes, parentheses and ; through literally")
+
+            adb.tap_xy(10, 20)
+            adb.keyevent("KEYCODE_ENTER")
+            assert _read_log(input_log) == ["[tap][10][20]", "[keyevent][KEYCODE_ENTER]"]
+            print("  ✓ tap_xy and keyevent arguments preserved")
+
+            with adb.batch():
+                adb.tap_xy(1, 2)
+                adb.type_text("a b")
+                assert _read_log(input_log) == []
+            assert _read_log(input_log) == ["[tap][1][2]", "[text][a%sb]"]
+            print("  ✓ batch() defers commands and flushes them in order")
+
+            adb.shell_pipeline([f"input text {ADB.quote_text('x (y')}", "input keyevent 66"])
+            assert _read_log(input_log) == ["[text][x%s(y]", "[keyevent][66]"]
+            print("  ✓ quote_text output is safe inside shell_pipeline")
+        finally:
+            adb.close()
+
+        return True
+    except Exception as e:
+        print(f"  ✗ Argument quoting test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_timeout():
+    """Test that a stuck command times out and the next one gets a new session."""
+    print("\nTesting shell timeout...")
+    try:
+        from mobileqa.tools.adb import ADB, ADBError
+
+        adb = ADB()
+        try:
+            adb._shell_exec("true")
+            stuck_session = adb._shell_session
+
+            start = time.monotonic()
+            try:
+                adb._shell_exec("sleep 10", timeout=0.5)
+                raise AssertionError("stuck command did not time out")
+            except ADBError as e:
+                assert "timed out" in str(e)
+            assert time.monotonic() - start < 5
+            assert stuck_session.poll() is not None
+            print("  ✓ Stuck command raises ADBError and kills the session")
+
+            assert adb._shell_exec("echo fresh") == "fresh\n"
+            assert adb._shell_session is not stuck_session
+            print("  ✓ Next command starts a new session")
+
+            # Waiting for another thread's command is not part of the budget
+            holder = threading.Thread(target=adb._shell_exec, args=("sleep 1",))
+            holder.start()
+            time.sleep(0.2)
+            assert adb._shell_exec("echo queued", timeout=0.5) == "queued\n"
+            holder.join()
+            print("  ✓ Time spent waiting for the session lock is not counted")
+        finally:
+            adb.close()
+
+        return True
+    except Exception as e:
+        print(f"  ✗ Shell timeout test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("ADB SHELL SESSION TESTS")
+    print("="*60)
+
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_log = _install_fake_adb(Path(tmp))
+
+        # Run tests
+        results.append(("Shell Output Test", test_shell_output()))
+        results.append(("Argument Quoting Test", test_argument_quoting(input_log)))
+        results.append(("Shell Timeout Test", test_timeout()))
+
+    # Print summary
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    for test_name, passed in results:
+        status = "✓ PASS" if passed else "✗ FAIL"
+        print(f"{status:8} {test_name}")
+
+    total_passed = sum(1 for _, passed in results if passed)
+    total_tests = len(results)
+
+    print(f"\nTotal: {total_passed}/{total_tests} tests passed")
+
+    if total_passed == total_tests:
+        print("\n🎉 All tests passed!")
+        return 0
+    else:
+        print("\n❌ Some tests failed. Please review the errors above.")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
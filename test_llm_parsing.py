@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test script for parsing and validating LLM responses.
+
+Covers extracting the JSON object from free-form model output and the
+memoized planner action validation. The modules under test import
+google-genai; without it (see requirements.txt) the tests are skipped.
+"""
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+
+def test_json_extraction():
+    """Test the brace scanner and the response parser built on it."""
+    print("\nTesting JSON extraction...")
+    try:
+        from mobileqa.llm.gemini_client import GeminiClient, _extract_json_object
+    except ImportError as e:
+        print(f"  - Skipped: {e}")
+        return None
+    try:
+        assert _extract_json_object('Here you go: {"a": {"b": 1}} hope it helps') == '{"a": {"b": 1}}'
+        assert _extract_json_object('{"a": 1} and then {"b": 2}') == '{"a": 1}'
+        print("  ✓ Nested object found; prose and later objects ignored")
+
+        text = 'x {"reason": "tap } then {", "q": "say \\"}\\"", "p": "c:\\\\"} y'
+        assert _extract_json_object(text) == text[2:-2]
+        print("  ✓ Braces and escaped quotes inside strings skipped")
+
+        assert _extract_json_object('no json here') is None
+        assert _extract_json_object('{"a": {"b": 1}') is None
+        print("  ✓ Missing or unbalanced objects return None")
+
+        parse = GeminiClient._parse_json_response
+        assert parse('{"ok": true}') == {"ok": True}
+        assert parse('```json\n{"ok": [1, 2]}\n```') == {"ok": [1, 2]}
+        assert parse('Sure! {"action_type": "done", "params": {}}. Done.') == {
+            "action_type": "done", "params": {}
+        }
+        for bad in ('', None, 'not json', '{"a": '):
+            try:
+                parse(bad)
+                raise AssertionError(f"parsed invalid response {bad!r}")
+            except ValueError:
+                pass
+        print("  ✓ _parse_json_response handles fences, prose and bad output")
+
+        return True
+    except Exception as e:
+        print(f"  ✗ JSON extraction test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_action_validation():
+    """Test _freeze and the memoized validate_action_schema."""
+    print("\nTesting action validation...")
+    try:
+        from mobileqa.agents.planner import PlannerAgent, _freeze, _thaw
+    except ImportError as e:
+        print(f"  - Skipped: {e}")
+        return None
+    try:
+        assert len({_freeze(1), _freeze(1.0), _freeze(True)}) == 3
+        assert _freeze({"a": 1, "b": [2]}) == _freeze({"b": [2], "a": 1})
+        assert _freeze({"a": [1]}) != _freeze({"a": (1,)})
+        value = {"params": {"x": 1, "y": 2.5, "tags": ["a", None, False]}}
+        assert _thaw(_freeze(value)) == value
+        print("  ✓ _freeze keys are order-insensitive and type-tagged; _thaw round-trips")
+
+        planner = PlannerAgent(llm_client=None)
+        cases = [
+            ({"action_type": "tap_xy", "description": "d", "params": {"x": 1, "y": 2}}, True),
+            ({"action_type": "tap_xy", "description": "d", "params": {"x": "1", "y": 2}}, False),
+            ({"action_type": "tap_by_text", "description": "d", "params": {"text": ""}}, False),
+            ({"action_type": "swipe", "description": "d", "params": {"direction": "up"}}, True),
+            ({"action_type": ["tap_xy"], "description": "d", "params": {}}, False),
+            ({"action_type": "done", "description": "d"}, False),
+            ({"action_type": "done", "description": "d", "params": {"set": {1}}}, True),
+        ]
+        for action, valid in cases:
+            assert planner.validate_action_schema(action)[0] is valid, action
+        assert planner.validate_action_schema("tap") == (False, "Action is not a dictionary")
+        print("  ✓ Valid and invalid actions classified, unhashable params included")
+
+        PlannerAgent._validate_frozen.cache_clear()
+        action = {"action_type": "input_text", "description": "d", "params": {"text": "hi"}}
+        for _ in range(3):
+            assert planner.validate_action_schema(dict(action)) == (True, "")
+        info = PlannerAgent._validate_frozen.cache_info()
+        assert (info.hits, info.misses) == (2, 1)
+        print("  ✓ Repeated actions are served from the validation cache")
+
+        return True
+    except Exception as e:
+        print(f"  ✗ Action validation test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("LLM RESPONSE PARSING TESTS")
+    print("="*60)
+
+    results = []
+
+    # Run tests
+    results.append(("JSON Extraction Test", test_json_extraction()))
+    results.append(("Action Validation Test", test_action_validation()))
+
+    # Print summary
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    for test_name, passed in results:
+        status = "- SKIP" if passed is None else "✓ PASS" if passed else "✗ FAIL"
+        print(f"{status:8} {test_name}")
+
+    total_passed = sum(1 for _, passed in results if passed)
+    total_skipped = sum(1 for _, passed in results if passed is None)
+    total_tests = len(results) - total_skipped
+
+    print(f"\nTotal: {total_passed}/{total_tests} tests passed ({total_skipped} skipped)")
+
+    if total_passed == total_tests:
+        print("\n🎉 All tests passed!")
+        return 0
+    else:
+        print("\n❌ Some tests failed. Please review the errors above.")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
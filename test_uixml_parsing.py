@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Test script for UI hierarchy parsing and text lookup.
+
+Checks the streaming XML parser against a straightforward recursive walk of
+the ElementTree, and the tier-skipping text searches against the plain
+three-tier definition they replace.
+"""
+import random
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+WORDS = ["Ok", "OK", "ok", "Okay", "Allow", "allow", "ALLOW all", "Cancel", "x", ""]
+
+
+def _sample_xml(rng: random.Random, node_count: int) -> bytes:
+    """Build a random nested uiautomator-style dump."""
+    root = ET.Element("hierarchy", rotation="0")
+    parents = [root]
+    for i in range(node_count):
+        attrs = {
+            "index": str(i % 7),
+            "text": rng.choice(WORDS + ["Título <b> & \"quoted\""]),
+            "resource-id": rng.choice(["", f"com.app:id/view_{i}"]),
+            "class": rng.choice(["android.widget.TextView", "android.widget.EditText"]),
+            "package": "com.app",
+            "content-desc": rng.choice(WORDS),
+            "bounds": f"[{i},{2 * i}][{i + 100},{2 * i + 50}]",
+        }
+        for flag in ("checkable", "checked", "clickable", "enabled", "focusable", "focused",
+                     "scrollable", "long-clickable", "password", "selected"):
+            if rng.random() < 0.5:
+                attrs[flag] = rng.choice(["true", "false"])
+        if rng.random() < 0.1:
+            del attrs["bounds"]
+        node = ET.SubElement(rng.choice(parents), "node", attrs)
+        parents.append(node)
+    return ET.tostring(root, encoding="utf-8")
+
+
+def _reference_parse(parser, data: bytes) -> list:
+    """Depth-first walk of the fully built tree (the pre-iterparse behaviour)."""
+    from mobileqa.tools.uixml import UINode
+
+    nodes = []
+
+    def walk(element):
+        get = element.get
+        nodes.append(UINode(
+            tag=element.tag,
+            index=int(get('index', '0')),
+            text=get('text', ''),
+            resource_id=get('resource-id', ''),
+            class_name=get('class', ''),
+            package=get('package', ''),
+            content_desc=get('content-desc', ''),
+            checkable=get('checkable', 'false') == 'true',
+            checked=get('checked', 'false') == 'true',
+            clickable=get('clickable', 'false') == 'true',
+            enabled=get('enabled', 'true') == 'true',
+            focusable=get('focusable', 'false') == 'true',
+            focused=get('focused', 'false') == 'true',
+            scrollable=get('scrollable', 'false') == 'true',
+            long_clickable=get('long-clickable', 'false') == 'true',
+            password=get('password', 'false') == 'true',
+            selected=get('selected', 'false') == 'true',
+            bounds=parser.parse_bounds(get('bounds', '[0,0][0,0]'))
+        ))
+        for child in element:
+            walk(child)
+
+    walk(ET.fromstring(data))
+    return nodes
+
+
+def _reference_find(nodes: list, text: str, exact: bool = False) -> list:
+    """find_by_text without the tier skipping: collect every tier, return the best."""
+    exact_matches, case_insensitive_matches, substring_matches = [], [], []
+    text_lower = text.lower()
+    for node in nodes:
+        if node.text == text or node.content_desc == text:
+            exact_matches.append(node)
+        elif exact:
+            continue
+        elif node.text.lower() == text_lower or node.content_desc.lower() == text_lower:
+            case_insensitive_matches.append(node)
+        elif text_lower in node.text.lower() or text_lower in node.content_desc.lower():
+            substring_matches.append(node)
+    return exact_matches or case_insensitive_matches or substring_matches
+
+
+def test_parse_equivalence():
+    """Test that the streaming parser matches a recursive tree walk."""
+    print("\nTesting XML parse equivalence...")
+    try:
+        from mobileqa.tools.uixml import UIXMLParser
+
+        parser = UIXMLParser(adb=None)
+        rng = random.Random(7)
+        for node_count in (0, 1, 5, 50, 600):
+            data = _sample_xml(rng, node_count)
+            parsed = parser._parse_nodes(data)
+            assert parsed == _reference_parse(parser, data)
+            assert len(parsed) == node_count + 1
+        print("  ✓ Same nodes, fields and document order as ElementTree")
+
+        node = parser._parse_nodes(b'<hierarchy><node text="A&amp;B" content-desc="Go" /></hierarchy>')[1]
+        assert (node.text, node.text_lower, node.content_desc_lower) == ("A&B", "a&b", "go")
+        assert node.bounds == (0, 0, 0, 0) and node.enabled and not node.clickable
+        print("  ✓ Entities, lowercase fields and attribute defaults")
+
+        return True
+    except Exception as e:
+        print(f"  ✗ Parse equivalence test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_text_lookup():
+    """Test find_by_text and find_first_by_texts against the three-tier definition."""
+    print("\nTesting text lookup...")
+    try:
+        from mobileqa.tools.uixml import UIXMLParser
+
+        parser = UIXMLParser(adb=None)
+        nodes = parser._parse_nodes(
+            b'<hierarchy>'
+            b'<node text="ok later" /><node text="OK" /><node content-desc="Ok" /><node text="ok" />'
+            b'</hierarchy>'
+        )
+        assert [n.content_desc or n.text for n in parser.find_by_text(nodes, "Ok")] == ["Ok"]
+        assert [n.content_desc or n.text for n in parser.find_by_text(nodes, "oK")] == ["OK", "Ok", "ok"]
+        assert [n.text for n in parser.find_by_text(nodes, "later")] == ["ok later"]
+        assert parser.find_by_text(nodes, "later", exact=True) == []
+        print("  ✓ Exact, case-insensitive and substring tiers in order")
+
+        rng = random.Random(11)
+        queries = WORDS[:-1] + ["o", "LL", "missing"]
+        for _ in range(2000):
+            data = _sample_xml(rng, rng.randint(0, 15))
+            nodes = parser._parse_nodes(data)
+            text = rng.choice(queries)
+            exact = rng.random() < 0.3
+            expected = _reference_find(nodes, text, exact)
+            assert [id(n) for n in parser.find_by_text(nodes, text, exact)] == [id(n) for n in expected]
+
+            texts = rng.sample(queries, 3)
+            firsts = parser.find_first_by_texts(nodes, texts)
+            for t in texts:
+                matches = _reference_find(nodes, t)
+                assert firsts.get(t) is (matches[0] if matches else None)
+        print("  ✓ Tier skipping returns the same matches as the full scan")
+        print("  ✓ find_first_by_texts agrees with find_by_text()[0]")
+
+        return True
+    except Exception as e:
+        print(f"  ✗ Text lookup test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("UI XML PARSING TESTS")
+    print("="*60)
+
+    results = []
+
+    # Run tests
+    results.append(("Parse Equivalence Test", test_parse_equivalence()))
+    results.append(("Text Lookup Test", test_text_lookup()))
+
+    # Print summary
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    for test_name, passed in results:
+        status = "✓ PASS" if passed else "✗ FAIL"
+        print(f"{status:8} {test_name}")
+
+    total_passed = sum(1 for _, passed in results if passed)
+    total_tests = len(results)
+
+    print(f"\nTotal: {total_passed}/{total_tests} tests passed")
+
+    if total_passed == total_tests:
+        print("\n🎉 All tests passed!")
+        return 0
+    else:
+        print("\n❌ Some tests failed. Please review the errors above.")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())